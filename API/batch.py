@@ -0,0 +1,37 @@
+import asyncio
+import aiohttp
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+# maximum number of requests a single bulk lookup keeps in flight at once
+DEFAULT_CONCURRENCY = 8
+
+async def gather_ordered(items: list[K], fetch: Callable[[K], Awaitable[tuple[T | None, str | None]]],
+                         concurrency: int = DEFAULT_CONCURRENCY,
+                         key: Callable[[K], Hashable] = lambda item: item) -> tuple[list[T | None], list[str | None]]:
+    """Runs fetch for every item with at most `concurrency` calls in flight.
+    Items with the same key are only fetched once. Returns the results and
+    errors in the same order as the input items."""
+    unique: dict[Hashable, K] = {}
+    for item in items:
+        unique.setdefault(key(item), item)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item: K) -> tuple[T | None, str | None]:
+        async with semaphore:
+            try:
+                return await fetch(item)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return None, f"{type(e).__name__}: {e}"
+
+    unique_results = await asyncio.gather(*[run(item) for item in unique.values()])
+    results_by_key = dict(zip(unique.keys(), unique_results))
+    results: list[T | None] = []
+    errors: list[str | None] = []
+    for item in items:
+        result, error = results_by_key[key(item)]
+        results.append(result)
+        errors.append(error)
+    return results, errors
@@ -0,0 +1,70 @@
+import time
+import aiohttp
+from models import WebsiteCredentials
+
+# status codes which mean the website itself is unavailable, rather than a problem with one request
+OUTAGE_STATUSES = {502, 503, 504}
+
+class WebsiteUnavailableException(aiohttp.ClientConnectionError):
+    """Raised instead of sending a request while the website's circuit breaker is open."""
+    def __init__(self, url: str, retry_in: float):
+        self.url = url
+        self.retry_in = retry_in
+        super().__init__(f"The website ({url}) is not responding right now, please try again in {max(1, round(retry_in))} seconds")
+
+class CircuitBreaker:
+    """Stops sending requests to a website after `failure_threshold` failures in a row.
+    While open every request fails immediately, and after `open_seconds` a single probe
+    request is let through: if it succeeds the breaker closes, otherwise it opens again."""
+    def __init__(self, url: str, failure_threshold: int, open_seconds: float):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.probing or time.monotonic() - self.opened_at >= self.open_seconds:
+            return "half-open"
+        return "open"
+
+    def before_request(self) -> bool:
+        """Raises WebsiteUnavailableException if the request shouldn't be sent.
+        Returns whether the request is the probe of a half-open breaker."""
+        if self.failure_threshold <= 0 or self.opened_at is None:
+            return False
+        retry_in = self.opened_at + self.open_seconds - time.monotonic()
+        if retry_in > 0 or self.probing:
+            raise WebsiteUnavailableException(self.url, max(retry_in, 0))
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                print(f"{self.url} failed {self.failures} requests in a row, pausing requests for {self.open_seconds}s")
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def probe_finished(self):
+        """Lets another probe through if the probe ended without a result (e.g. it was cancelled)."""
+        self.probing = False
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+def get_breaker(credentials: WebsiteCredentials) -> CircuitBreaker:
+    breaker = _breakers.get(credentials.url, None)
+    if breaker is None:
+        breaker = CircuitBreaker(credentials.url, credentials.breaker_failure_threshold, credentials.breaker_open_seconds)
+        _breakers[credentials.url] = breaker
+    return breaker
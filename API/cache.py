@@ -0,0 +1,175 @@
+import copy
+import time
+import msgspec
+from dataclasses import dataclass
+from typing import Callable
+from models import WebsiteCredentials, Player, PlayerAllGames, Table
+
+# how long (in seconds) found players and misses are served from memory
+PLAYER_TTL = 30
+MISSING_PLAYER_TTL = 5
+# tables can still be edited on the website itself, so don't keep them for long
+TABLE_TTL = 60
+
+@dataclass
+class _CacheEntry:
+    player: Player | PlayerAllGames | None
+    expires_at: float
+
+class PlayerCache:
+    """In-memory player cache indexed by every lookup field of the /api/player endpoints
+    (name, id, discordId, mkcId and fc), so a player fetched by one field is a hit for all others."""
+    def __init__(self, ttl: float = PLAYER_TTL, missing_ttl: float = MISSING_PLAYER_TTL):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.entries: dict[tuple[str, str], _CacheEntry] = {}
+        # bumped on every invalidation so that requests which started before
+        # a mutation don't put stale data back into the cache
+        self.generation = 0
+
+    @staticmethod
+    def _key(field: str, value: str | int) -> tuple[str, str]:
+        return field, str(value).strip().lower()
+
+    @staticmethod
+    def _player_keys(player: Player | PlayerAllGames):
+        keys = [PlayerCache._key("name", player.name), PlayerCache._key("id", player.id)]
+        if player.discord_id:
+            keys.append(PlayerCache._key("discordId", player.discord_id))
+        if player.mkc_id:
+            keys.append(PlayerCache._key("mkcId", player.mkc_id))
+        if player.fc:
+            keys.append(PlayerCache._key("fc", player.fc))
+        return keys
+
+    def get(self, field: str, value: str | int) -> tuple[bool, Player | PlayerAllGames | None]:
+        key = self._key(field, value)
+        entry = self.entries.get(key, None)
+        if entry is None:
+            return False, None
+        if entry.expires_at < time.monotonic():
+            del self.entries[key]
+            return False, None
+        # callers are free to modify the players they get back
+        return True, copy.copy(entry.player)
+
+    def put(self, player: Player | PlayerAllGames, generation: int):
+        if generation != self.generation:
+            return
+        entry = _CacheEntry(copy.copy(player), time.monotonic() + self.ttl)
+        for key in self._player_keys(player):
+            self.entries[key] = entry
+
+    def put_missing(self, field: str, value: str | int, generation: int):
+        if generation != self.generation:
+            return
+        self.entries[self._key(field, value)] = _CacheEntry(None, time.monotonic() + self.missing_ttl)
+
+    def invalidate(self, field: str, value: str | int):
+        self.generation += 1
+        entry = self.entries.pop(self._key(field, value), None)
+        if entry is None or entry.player is None:
+            return
+        for key in self._player_keys(entry.player):
+            if self.entries.get(key, None) is entry:
+                del self.entries[key]
+
+    def clear(self):
+        self.generation += 1
+        self.entries.clear()
+
+# called with (credentials, field, value) whenever a player is changed through the API,
+# or (credentials, None, None) when any player may have changed
+_change_listeners: list[Callable[[WebsiteCredentials, str | None, str | int | None], None]] = []
+
+def add_change_listener(listener: Callable[[WebsiteCredentials, str | None, str | int | None], None]):
+    _change_listeners.append(listener)
+
+_ALL_GAMES = "*"
+_player_caches: dict[tuple[str, str | None], PlayerCache] = {}
+
+def get_player_cache(credentials: WebsiteCredentials, all_games=False) -> PlayerCache:
+    # players have a different MMR in each game, but the all games endpoint is shared by the whole website
+    key = (credentials.url, _ALL_GAMES if all_games else credentials.game)
+    cache = _player_caches.get(key, None)
+    if cache is None:
+        cache = PlayerCache()
+        _player_caches[key] = cache
+    return cache
+
+def invalidate_player(credentials: WebsiteCredentials, field: str, value: str | int):
+    """Removes a player from every cache of this website after it was changed."""
+    for (url, _), cache in _player_caches.items():
+        if url == credentials.url:
+            cache.invalidate(field, value)
+    for listener in _change_listeners:
+        listener(credentials, field, value)
+
+def clear_player_cache(credentials: WebsiteCredentials):
+    for (url, _), cache in _player_caches.items():
+        if url == credentials.url:
+            cache.clear()
+    for listener in _change_listeners:
+        listener(credentials, None, None)
+
+@dataclass
+class _TableEntry:
+    # stored as msgpack, since decoding it is several times faster than deep copying a table
+    data: bytes
+    expires_at: float
+
+_table_encoder = msgspec.msgpack.Encoder()
+_table_decoder = msgspec.msgpack.Decoder(Table)
+
+class TableCache:
+    """In-memory cache of a leaderboard's tables by ID. The API functions which change a
+    table update or drop its entry. Every get returns a new copy of the table, since
+    commands edit the scores of the tables they fetch."""
+    def __init__(self, ttl: float = TABLE_TTL):
+        self.ttl = ttl
+        self.entries: dict[int, _TableEntry] = {}
+        self.generation = 0
+
+    def get(self, table_id: int) -> Table | None:
+        entry = self.entries.get(table_id, None)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self.entries[table_id]
+            return None
+        return _table_decoder.decode(entry.data)
+
+    def put(self, table: Table, generation: int | None = None):
+        """Caches a table. Pass the generation from before the request was sent when
+        fetching a table, so that it isn't cached if the table changed in the meantime."""
+        if generation is None:
+            # the table came from a change we made, so it's newer than anything being fetched
+            self.generation += 1
+        elif generation != self.generation:
+            return
+        self.entries[table.id] = _TableEntry(_table_encoder.encode(table), time.monotonic() + self.ttl)
+
+    def update(self, table_id: int, **fields):
+        """Sets fields of a cached table after they were changed on the website."""
+        self.generation += 1
+        entry = self.entries.get(table_id, None)
+        if entry is None:
+            return
+        table = _table_decoder.decode(entry.data)
+        for name, value in fields.items():
+            setattr(table, name, value)
+        entry.data = _table_encoder.encode(table)
+
+    def invalidate(self, table_id: int):
+        self.generation += 1
+        self.entries.pop(table_id, None)
+
+_table_caches: dict[tuple[str, str | None], TableCache] = {}
+
+def get_table_cache(credentials: WebsiteCredentials) -> TableCache:
+    key = (credentials.url, credentials.game)
+    cache = _table_caches.get(key, None)
+    if cache is None:
+        cache = TableCache()
+        _table_caches[key] = cache
+    return cache
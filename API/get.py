@@ -1,246 +1,239 @@
-import aiohttp
-from models import Table, WebsiteCredentials, Player, PlayerDetailed, NameChangeRequest, ListPlayer, Penalty, PlayerAllGames, PenaltyRequest, PlayerBasic
+from API.request import request, stream
+from API.schemas import ArrayItemSplitter, ListPlayerSchema, decode_name_changes, decode_penalties, decode_penalty_request, decode_penalty_requests, decode_player, decode_player_all_games, decode_player_detailed, decode_table, decode_tables
+from API.batch import gather_ordered, DEFAULT_CONCURRENCY
+from API.cache import get_player_cache, get_table_cache
+from API.stats import endpoint_name, record_response, record_decode
+from models import WebsiteCredentials, Player, ListPlayer, PlayerAllGames
 from io import BytesIO
+from typing import AsyncIterator
+import aiohttp
+import asyncio
+import msgspec
+import time
 
-headers = {'Content-type': 'application/json'}
+# size of the chunks large responses are read and decoded in
+STREAM_CHUNK_SIZE = 64 * 1024
 
 async def getStrikes(credentials: WebsiteCredentials, name: str):
     request_url = f"{credentials.url}/api/penalty/list?name={name}&isStrike=true"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None, await resp.text()
-            body = await resp.json()
-            strikes = Penalty.from_list_api_response(body)
-            return strikes, None
-
-async def getPlayers(credentials: WebsiteCredentials, names: list[str]):
-    base_url = f"{credentials.url}/api/player"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        players: list[Player | None] = []
-        for name in names:
-            request_url = f"{base_url}?name={name}"
-            if credentials.game:
-                request_url += f"&game={credentials.game}"
-            async with session.get(request_url, headers=headers) as resp:
-                if resp.status != 200:
-                    players.append(None)
-                    continue
-                body = await resp.json()
-                player = Player.from_api_response(body)
-                players.append(player)
-        return players
-        
-async def getPlayer(credentials: WebsiteCredentials, name: str) -> Player | None:
-    request_url = f"{credentials.url}/api/player?name={name}"
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None, resp.text()
+    strikes = resp.decode(decode_penalties)
+    return strikes, None
+
+async def _getPlayerBy(credentials: WebsiteCredentials, field: str, value: str | int) -> tuple[Player | None, str | None]:
+    cache = get_player_cache(credentials)
+    found, cached_player = cache.get(field, value)
+    if found:
+        assert not isinstance(cached_player, PlayerAllGames)
+        return cached_player, None if cached_player else "Player not found"
+    generation = cache.generation
+    request_url = f"{credentials.url}/api/player?{field}={value}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player
+    resp = await request(credentials, "GET", request_url)
+    if resp.status == 404:
+        cache.put_missing(field, value, generation)
+        return None, "Player not found"
+    if resp.status != 200:
+        return None, f"{resp.status} - {resp.text()}"
+    player = resp.decode(decode_player)
+    cache.put(player, generation)
+    return player, None
+
+async def _getPlayerAllGamesBy(credentials: WebsiteCredentials, field: str, value: str | int) -> PlayerAllGames | None:
+    cache = get_player_cache(credentials, all_games=True)
+    found, cached_player = cache.get(field, value)
+    if found:
+        assert not isinstance(cached_player, Player)
+        return cached_player
+    generation = cache.generation
+    request_url = f"{credentials.url}/api/player/allgames?{field}={value}"
+    resp = await request(credentials, "GET", request_url)
+    if resp.status == 404:
+        cache.put_missing(field, value, generation)
+        return None
+    if resp.status != 200:
+        return None
+    player = resp.decode(decode_player_all_games)
+    cache.put(player, generation)
+    return player
+
+async def getPlayers(credentials: WebsiteCredentials, names: list[str], concurrency: int = DEFAULT_CONCURRENCY) -> tuple[list[Player | None], list[str | None]]:
+    return await gather_ordered(names, lambda name: _getPlayerBy(credentials, "name", name),
+                                concurrency, key=lambda name: name.strip().lower())
+
+async def getPlayersFromDiscord(credentials: WebsiteCredentials, discord_ids: list[int], concurrency: int = DEFAULT_CONCURRENCY) -> tuple[list[Player | None], list[str | None]]:
+    return await gather_ordered(discord_ids, lambda discord_id: _getPlayerBy(credentials, "discordId", discord_id), concurrency)
+
+async def getPlayersFromLounge(credentials: WebsiteCredentials, lounge_ids: list[int], concurrency: int = DEFAULT_CONCURRENCY) -> tuple[list[Player | None], list[str | None]]:
+    return await gather_ordered(lounge_ids, lambda lounge_id: _getPlayerBy(credentials, "id", lounge_id), concurrency)
+        
+async def getPlayer(credentials: WebsiteCredentials, name: str) -> Player | None:
+    player, _ = await _getPlayerBy(credentials, "name", name)
+    return player
 
 async def getPlayerFromMKC(credentials: WebsiteCredentials, mkc_id: int):
-    request_url = f"{credentials.url}/api/player?mkcId={mkc_id}"
-    if credentials.game:
-        request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player
+    player, _ = await _getPlayerBy(credentials, "mkcId", mkc_id)
+    return player
         
 async def getPlayerFromFC(credentials: WebsiteCredentials, fc: str):
-    request_url = f"{credentials.url}/api/player?fc={fc}"
-    if credentials.game:
-        request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player
+    player, _ = await _getPlayerBy(credentials, "fc", fc)
+    return player
 
 async def getPlayerFromLounge(credentials: WebsiteCredentials, lounge_id: int):
-    request_url = f"{credentials.url}/api/player?id={lounge_id}"
-    if credentials.game:
-        request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player
+    player, _ = await _getPlayerBy(credentials, "id", lounge_id)
+    return player
         
 async def getPlayerFromDiscord(credentials: WebsiteCredentials, discord_id: int):
-    request_url = f"{credentials.url}/api/player?discordId={discord_id}"
-    if credentials.game:
-        request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player
+    player, _ = await _getPlayerBy(credentials, "discordId", discord_id)
+    return player
 
 async def getPlayerAllGames(credentials: WebsiteCredentials, name: str) -> Player | PlayerAllGames | None:
     if not credentials.has_all_games_endpoint:
         return await getPlayer(credentials, name)
-    request_url = f"{credentials.url}/api/player/allgames?name={name}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = PlayerAllGames.from_api_response(body)
-            return player
+    return await _getPlayerAllGamesBy(credentials, "name", name)
         
 async def getPlayerAllGamesFromMKC(credentials: WebsiteCredentials, mkc_id: int) -> Player | PlayerAllGames | None:
     if not credentials.has_all_games_endpoint:
         return await getPlayerFromMKC(credentials, mkc_id)
-    request_url = f"{credentials.url}/api/player/allgames?mkcId={mkc_id}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = PlayerAllGames.from_api_response(body)
-            return player
+    return await _getPlayerAllGamesBy(credentials, "mkcId", mkc_id)
         
 async def getPlayerAllGamesFromLounge(credentials: WebsiteCredentials, lounge_id: int) -> Player | PlayerAllGames | None:
     if not credentials.has_all_games_endpoint:
         return await getPlayerFromLounge(credentials, lounge_id)
-    request_url = f"{credentials.url}/api/player/allgames?id={lounge_id}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = PlayerAllGames.from_api_response(body)
-            return player
+    return await _getPlayerAllGamesBy(credentials, "id", lounge_id)
         
 async def getPlayerAllGamesFromDiscord(credentials: WebsiteCredentials, discord_id: int) -> Player | PlayerAllGames | None:
     if not credentials.has_all_games_endpoint:
         return await getPlayerFromDiscord(credentials, discord_id)
-    request_url = f"{credentials.url}/api/player/allgames?discordId={discord_id}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            player = PlayerAllGames.from_api_response(body)
-            return player
+    return await _getPlayerAllGamesBy(credentials, "discordId", discord_id)
         
+async def getPlayersAllGamesFromDiscord(credentials: WebsiteCredentials, discord_ids: list[int],
+                                        concurrency: int = DEFAULT_CONCURRENCY) -> tuple[list[Player | PlayerAllGames | None], list[str | None]]:
+    async def fetch(discord_id: int):
+        return await getPlayerAllGamesFromDiscord(credentials, discord_id), None
+    return await gather_ordered(discord_ids, fetch, concurrency)
+
 async def getPlayerDetails(credentials: WebsiteCredentials, name: str):
     request_url = f"{credentials.url}/api/player/details?name={name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            playerData = await resp.json()
-            player = PlayerDetailed.from_api_response(playerData)
-            return player
-        
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    player = resp.decode(decode_player_detailed)
+    return player
+    
 async def getPlayerDetailsFromDiscord(credentials: WebsiteCredentials, discord_id: int):
     request_url = f"{credentials.url}/api/player/details?discordId={discord_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            playerData = await resp.json()
-            player = PlayerDetailed.from_api_response(playerData)
-            return player
-        
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    player = resp.decode(decode_player_detailed)
+    return player
+    
 async def getTable(credentials: WebsiteCredentials, table_id: int):
+    cache = get_table_cache(credentials)
+    table = cache.get(table_id)
+    if table is not None:
+        return table
+    generation = cache.generation
     request_url = f"{credentials.url}/api/table?tableId={table_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            table = await resp.json()
-            return Table.from_api_response(table)
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    table = resp.decode(decode_table)
+    cache.put(table, generation)
+    return table
 
 async def getPending(credentials: WebsiteCredentials):
     request_url = f"{credentials.url}/api/table/unverified"
     if credentials.game:
         request_url += f"?game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            tables = Table.from_list_api_response(body)
-            return tables
+    cache = get_table_cache(credentials)
+    generation = cache.generation
+    resp = await request(credentials, "GET", request_url, conditional=True)
+    if resp.status != 200:
+        return None
+    tables = resp.decode(decode_tables)
+    for table in tables:
+        cache.put(table, generation)
+    return tables
     
-async def getPlayerList(credentials: WebsiteCredentials) -> list[ListPlayer] | None:
+async def streamPlayerList(credentials: WebsiteCredentials) -> AsyncIterator[ListPlayer]:
+    """Yields the players on the leaderboard as the player list downloads, without
+    holding the whole response in memory. Raises aiohttp.ClientResponseError if the
+    website returns an error."""
     request_url = f"{credentials.url}/api/player/list"
     if credentials.game:
         request_url += f"?game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            players = ListPlayer.from_list_api_response(body)
-            return players
+    endpoint = endpoint_name("GET", request_url)
+    async with stream(credentials, request_url) as resp:
+        resp.raise_for_status()
+        splitter = ArrayItemSplitter(ListPlayerSchema)
+        body_bytes = 0
+        decode_seconds = 0.0
+        count = 0
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            body_bytes += len(chunk)
+            start = time.perf_counter()
+            players = [player.to_model() for player in splitter.feed(chunk)]
+            decode_seconds += time.perf_counter() - start
+            count += len(players)
+            for player in players:
+                yield player
+        splitter.close()
+        record_response(endpoint, resp.content_length or body_bytes, body_bytes)
+        record_decode(endpoint, decode_seconds, count)
+
+async def getPlayerList(credentials: WebsiteCredentials) -> list[ListPlayer] | None:
+    try:
+        return [player async for player in streamPlayerList(credentials)]
+    except (aiohttp.ClientError, asyncio.TimeoutError, msgspec.DecodeError):
+        return None
 
 async def getPendingNameChanges(credentials: WebsiteCredentials):
     request_url = f"{credentials.url}/api/player/listPendingNameChanges"
     if credentials.game:
         request_url += f"?game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            changes = NameChangeRequest.list_from_api_response(body)
-            return changes
+    resp = await request(credentials, "GET", request_url, conditional=True)
+    if resp.status != 200:
+        return None
+    changes = resp.decode(decode_name_changes)
+    return changes
 
 async def downloadTableImage(credentials: WebsiteCredentials, table_id: int):
     request_url = f"{credentials.url}/TableImage/{table_id}.png"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url) as resp:
-            if resp.status != 200:
-                return None
-            else:
-                return BytesIO(await resp.read())
-                
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    else:
+        return BytesIO(resp.body)
+            
 async def getPenaltyRequest(credentials: WebsiteCredentials, request_id: int):
     request_url = f"{credentials.url}/api/penaltyrequest?id={request_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url, headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            request = PenaltyRequest.from_api_response(body)
-            return request
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    penalty_request = resp.decode(decode_penalty_request)
+    return penalty_request
 
 async def getPendingPenaltyRequests(credentials: WebsiteCredentials):
     request_url = f"{credentials.url}/api/penaltyrequest/list"
     if credentials.game:
         request_url += f"?game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.get(request_url, headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            body = await resp.json()
-            requests = PenaltyRequest.from_list_api_response(body)
-            return requests
\ No newline at end of file
+    resp = await request(credentials, "GET", request_url, conditional=True)
+    if resp.status != 200:
+        return None
+    requests = resp.decode(decode_penalty_requests)
+    return requests
\ No newline at end of file
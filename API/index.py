@@ -0,0 +1,317 @@
+import asyncio
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+import aiohttp
+import msgspec
+from models import WebsiteCredentials, ListPlayer, Player, PlayerListChanges
+import API.get
+from API.cache import add_change_listener
+
+# how often (in seconds) an index is downloaded again in the background when it's used
+PLAYER_INDEX_REFRESH_INTERVAL = 600
+
+_MISSING = -1
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+class _HashIndex:
+    """Open addressing hash table from a key to a row number, stored in a flat array.
+    The keys themselves aren't stored; a probe checks its candidate row with `matches`."""
+    def __init__(self, size: int):
+        self.bits = max(3, (size * 2 - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        # row + 1, 0 means the slot is empty
+        self.slots = array('i', bytes(4 << self.bits))
+
+    def _start(self, key) -> int:
+        return ((hash(key) * _HASH_MULTIPLIER) & _MASK_64) >> (64 - self.bits)
+
+    def add(self, key, row: int):
+        i = self._start(key)
+        while self.slots[i]:
+            i = (i + 1) & self.mask
+        self.slots[i] = row + 1
+
+    def find(self, key, matches) -> int | None:
+        i = self._start(key)
+        while self.slots[i]:
+            row = self.slots[i] - 1
+            if matches(row):
+                return row
+            i = (i + 1) & self.mask
+        return None
+
+class PlayerIndex:
+    """Snapshot of a leaderboard's player list stored in array-backed columns, with hash
+    indexes by lowercase name, Lounge ID and discord ID and a sorted MMR column.
+
+    Players changed through API.post since the snapshot was taken are marked as changed,
+    and lookups for them report that the index doesn't know the answer so that the
+    caller can ask the website instead."""
+    def __init__(self, players: list[ListPlayer] | None = None):
+        self.ids = array('q')
+        self.mmrs = array('i')
+        self.events_played = array('i')
+        self.mkc_ids = array('q')
+        self.discord_ids = array('q')
+        self.names: list[str] = []
+        self.created_at = time.monotonic()
+        self.changed_rows: set[int] = set()
+        self.changed_keys: set[tuple[str, str]] = set()
+        self.all_changed = False
+        self.built = False
+        for player in players or []:
+            self.append(player)
+        if players is not None:
+            self.build()
+            self.apply_changes()
+
+    def append(self, player: ListPlayer):
+        self.ids.append(player.id)
+        self.mmrs.append(player.mmr if player.mmr is not None else _MISSING)
+        self.events_played.append(player.events_played)
+        self.mkc_ids.append(player.mkc_id or _MISSING)
+        self.discord_ids.append(int(player.discord_id) if player.discord_id else _MISSING)
+        self.names.append(sys.intern(player.name))
+
+    def build(self):
+        """Builds the lookup indexes once all the players have been appended."""
+        count = len(self.ids)
+        self.by_name = _HashIndex(count)
+        self.by_id = _HashIndex(count)
+        self.by_discord = _HashIndex(count)
+        for row in range(count):
+            self.by_name.add(self.names[row].lower(), row)
+            self.by_id.add(self.ids[row], row)
+            if self.discord_ids[row] != _MISSING:
+                self.by_discord.add(self.discord_ids[row], row)
+        ranked = sorted((row for row in range(count) if self.mmrs[row] != _MISSING), key=lambda row: self.mmrs[row])
+        self.mmr_order = array('i', ranked)
+        self.sorted_mmrs = array('i', (self.mmrs[row] for row in ranked))
+        self.built = True
+
+    def apply_changes(self):
+        """Marks the rows of players changed while the index was being built."""
+        for field, value in list(self.changed_keys):
+            row = self._find(field, value)
+            if row is not None:
+                self.changed_rows.add(row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def player(self, row: int) -> ListPlayer:
+        mmr = self.mmrs[row]
+        mkc_id = self.mkc_ids[row]
+        discord_id = self.discord_ids[row]
+        return ListPlayer(self.ids[row], self.names[row], mkc_id if mkc_id != _MISSING else None,
+                          mmr if mmr != _MISSING else None, discord_id if discord_id != _MISSING else None,
+                          self.events_played[row])
+
+    @staticmethod
+    def _key(field: str, value: str | int) -> tuple[str, str]:
+        return field, str(value).strip().lower()
+
+    def _find(self, field: str, value: str | int) -> int | None:
+        if field == "name":
+            name = str(value).strip().lower()
+            return self.by_name.find(name, lambda row: self.names[row].lower() == name)
+        try:
+            number = int(value)
+        except ValueError:
+            return None
+        if field == "id":
+            return self.by_id.find(number, lambda row: self.ids[row] == number)
+        if field == "discordId":
+            return self.by_discord.find(number, lambda row: self.discord_ids[row] == number)
+        return None
+
+    def lookup(self, field: str, value: str | int) -> tuple[bool, ListPlayer | None]:
+        """Finds a player by name, id or discordId. Returns whether the index knows the
+        answer, and the player if they exist."""
+        if self.all_changed or self._key(field, value) in self.changed_keys:
+            return False, None
+        row = self._find(field, value)
+        if row is None:
+            return True, None
+        if row in self.changed_rows:
+            return False, None
+        return True, self.player(row)
+
+    def mark_changed(self, field: str, value: str | int):
+        self.changed_keys.add(self._key(field, value))
+        if not self.built:
+            return
+        row = self._find(field, value)
+        if row is not None:
+            self.changed_rows.add(row)
+
+    def players_in_mmr_range(self, low: int, high: int) -> list[ListPlayer]:
+        """Returns the players with low <= MMR <= high, in ascending order of MMR."""
+        start = bisect_left(self.sorted_mmrs, low)
+        end = bisect_right(self.sorted_mmrs, high)
+        return [self.player(row) for row in self.mmr_order[start:end] if row not in self.changed_rows]
+
+    def players_without_discord(self) -> list[ListPlayer]:
+        return [self.player(row) for row in range(len(self.ids))
+                if self.discord_ids[row] == _MISSING and row not in self.changed_rows]
+
+def diff_player_indexes(old: PlayerIndex, new: PlayerIndex) -> PlayerListChanges:
+    """Compares two snapshots of the same leaderboard by player ID."""
+    changes = PlayerListChanges([], [], [], [], [], [])
+    seen = bytearray(len(old))
+    for row in range(len(new)):
+        player_id = new.ids[row]
+        old_row = old.by_id.find(player_id, lambda r: old.ids[r] == player_id)
+        if old_row is None:
+            changes.added.append(new.player(row))
+            continue
+        seen[old_row] = 1
+        mmr_changed = old.mmrs[old_row] != new.mmrs[row]
+        renamed = old.names[old_row] != new.names[row]
+        discord_changed = old.discord_ids[old_row] != new.discord_ids[row]
+        if not (mmr_changed or renamed or discord_changed or old.events_played[old_row] != new.events_played[row]
+                or old.mkc_ids[old_row] != new.mkc_ids[row]):
+            continue
+        pair = (old.player(old_row), new.player(row))
+        changes.updated.append(pair)
+        if mmr_changed:
+            changes.mmr_changed.append(pair)
+        if renamed:
+            changes.renamed.append(pair)
+        if discord_changed:
+            changes.discord_changed.append(pair)
+    changes.removed = [old.player(row) for row in range(len(old)) if not seen[row]]
+    return changes
+
+_indexes: dict[tuple[str, str | None], PlayerIndex] = {}
+_refreshing: dict[tuple[str, str | None], asyncio.Task] = {}
+# indexes which are still downloading, so that they are told about changes made in the meantime
+_downloading: dict[tuple[str, str | None], PlayerIndex] = {}
+# indexes being built from a saved copy of the player list
+_loading: list[tuple[str, PlayerIndex]] = []
+
+def _index_key(credentials: WebsiteCredentials):
+    return credentials.url, credentials.game
+
+async def _download_index(credentials: WebsiteCredentials) -> PlayerIndex | None:
+    key = _index_key(credentials)
+    index = PlayerIndex()
+    _downloading[key] = index
+    try:
+        async for player in API.get.streamPlayerList(credentials):
+            index.append(player)
+        # building the hash tables for 100k players takes a little while, so keep it off the event loop
+        await asyncio.to_thread(index.build)
+    except (aiohttp.ClientError, asyncio.TimeoutError, msgspec.DecodeError) as e:
+        print(f"Failed to download the player list for {credentials.url}: {e}")
+        return None
+    finally:
+        _downloading.pop(key, None)
+    index.apply_changes()
+    _indexes[key] = index
+    return index
+
+async def load_player_index(credentials: WebsiteCredentials, players: list[ListPlayer], saved_at: float) -> PlayerIndex:
+    """Builds an index from a saved copy of the player list taken at the unix time saved_at.
+    It's only used until a fresh download finishes, so it doesn't replace a downloaded index."""
+    index = PlayerIndex()
+    for player in players:
+        index.append(player)
+    _loading.append((credentials.url, index))
+    try:
+        await asyncio.to_thread(index.build)
+    finally:
+        _loading.remove((credentials.url, index))
+    index.apply_changes()
+    # make the index as old as the saved copy, so it gets refreshed like any other old index
+    index.created_at -= max(0, time.time() - saved_at)
+    _indexes.setdefault(_index_key(credentials), index)
+    return index
+
+async def refresh_player_index(credentials: WebsiteCredentials) -> PlayerIndex | None:
+    """Downloads the player list again and replaces the index. Concurrent
+    refreshes of the same leaderboard share one download."""
+    key = _index_key(credentials)
+    task = _refreshing.get(key, None)
+    if task is None:
+        task = asyncio.create_task(_download_index(credentials))
+        _refreshing[key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(key, None))
+    return await asyncio.shield(task)
+
+async def get_player_index(credentials: WebsiteCredentials, max_age: float | None = None) -> PlayerIndex | None:
+    """Returns the player index of this leaderboard, downloading it if we don't have one
+    or it's older than max_age. Old or outdated indexes are refreshed in the background."""
+    index = _indexes.get(_index_key(credentials), None)
+    if index is None or (max_age is not None and time.monotonic() - index.created_at > max_age):
+        return await refresh_player_index(credentials)
+    if index.all_changed or time.monotonic() - index.created_at > PLAYER_INDEX_REFRESH_INTERVAL:
+        if _index_key(credentials) not in _refreshing:
+            asyncio.create_task(refresh_player_index(credentials))
+    return index
+
+def _website_indexes(credentials: WebsiteCredentials):
+    for registry in (_indexes, _downloading):
+        for (url, _), index in registry.items():
+            if url == credentials.url:
+                yield index
+    for url, index in _loading:
+        if url == credentials.url:
+            yield index
+
+def _player_changed(credentials: WebsiteCredentials, field: str | None, value: str | int | None):
+    for index in _website_indexes(credentials):
+        if field is None or value is None:
+            index.all_changed = True
+        else:
+            index.mark_changed(field, value)
+
+add_change_listener(_player_changed)
+
+async def getIndexedPlayersFromDiscord(credentials: WebsiteCredentials, discord_ids: list[int], max_age: float | None = None,
+                                       trust_misses: bool = True) -> tuple[list[ListPlayer | Player | None], list[str | None]]:
+    """Looks up players by discord ID in the player index, only asking the
+    website about players which changed since the index was downloaded.
+    Returns the players and errors in the same order as the discord IDs, like
+    API.get.getPlayersFromDiscord; the error is "Player not found" for accounts
+    that aren't linked to a player, and something else if the lookup failed.
+
+    Without trust_misses, the website is also asked about accounts that aren't in the
+    index, since they may have been linked after the index was downloaded."""
+    index = await get_player_index(credentials, max_age)
+    players: list[ListPlayer | Player | None] = []
+    errors: list[str | None] = []
+    unknown: list[int] = []
+    for discord_id in discord_ids:
+        known, player = index.lookup("discordId", discord_id) if index else (False, None)
+        players.append(player)
+        errors.append(None if player is not None else "Player not found")
+        if not known or (player is None and not trust_misses):
+            unknown.append(len(players) - 1)
+    if unknown:
+        fetched, fetch_errors = await API.get.getPlayersFromDiscord(credentials, [discord_ids[i] for i in unknown])
+        for i, player, error in zip(unknown, fetched, fetch_errors):
+            players[i] = player
+            errors[i] = error
+    return players, errors
+
+async def getIndexedPlayerFromDiscord(credentials: WebsiteCredentials, discord_id: int) -> tuple[ListPlayer | Player | None, str | None]:
+    players, errors = await getIndexedPlayersFromDiscord(credentials, [discord_id], trust_misses=False)
+    return players[0], errors[0]
+
+async def isNameTaken(credentials: WebsiteCredentials, name: str, player_id: int | None = None) -> bool:
+    """Checks whether a player other than player_id already has this name, so that a command
+    can stop before asking for confirmation. This is only a quick check with the player index:
+    if no index is loaded it returns False and leaves it to the website to reject the name.
+    If the index says the name is taken, the website has the final say."""
+    index = _indexes.get(_index_key(credentials), None)
+    if index is None:
+        return False
+    known, player = index.lookup("name", name)
+    if known and (player is None or player.id == player_id):
+        return False
+    player = await API.get.getPlayer(credentials, name)
+    return player is not None and player.id != player_id
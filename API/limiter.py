@@ -0,0 +1,69 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from models import WebsiteCredentials
+
+# set while running a bulk job, so that its requests yield to interactive commands
+_bulk_lane: ContextVar[bool] = ContextVar("bulk_lane", default=False)
+
+@contextmanager
+def bulk():
+    """Marks every API call made inside this block (including from tasks
+    started inside it) as part of a bulk job."""
+    token = _bulk_lane.set(True)
+    try:
+        yield
+    finally:
+        _bulk_lane.reset(token)
+
+class RateLimiter:
+    """Token bucket shared by every request to one website. Interactive requests can
+    use the whole bucket, while bulk requests leave a reserve of tokens untouched and
+    wait whenever an interactive request is waiting, so they never hold up commands."""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.reserve = self.burst // 4
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.interactive_waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, is_bulk: bool):
+        if self.rate <= 0:
+            return
+        floor = self.reserve if is_bulk else 0
+        while True:
+            self._refill()
+            if self.tokens - floor >= 1 and not (is_bulk and self.interactive_waiting):
+                self.tokens -= 1
+                return
+            wait = (1 + floor - self.tokens) / self.rate
+            if wait <= 0:
+                # there are enough tokens, but an interactive request is waiting for them
+                wait = 1 / self.rate
+            if is_bulk:
+                await asyncio.sleep(wait)
+                continue
+            self.interactive_waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.interactive_waiting -= 1
+
+_limiters: dict[str, RateLimiter] = {}
+
+def get_limiter(credentials: WebsiteCredentials) -> RateLimiter:
+    limiter = _limiters.get(credentials.url, None)
+    if limiter is None:
+        limiter = RateLimiter(credentials.requests_per_second, credentials.request_burst)
+        _limiters[credentials.url] = limiter
+    return limiter
+
+async def wait_for_turn(credentials: WebsiteCredentials):
+    await get_limiter(credentials).acquire(_bulk_lane.get())
@@ -0,0 +1,58 @@
+import asyncio
+import aiohttp
+from typing import Any, Awaitable, Callable
+import API.post
+from API.batch import DEFAULT_CONCURRENCY
+from API.request import record_statuses, RETRYABLE_STATUSES
+from models import WebsiteCredentials
+
+# API.post functions which can be sent through the outbox, and whether
+# sending them a second time is harmless
+OUTBOX_OPERATIONS: dict[str, tuple[Callable[..., Awaitable[tuple[Any, Any]]], bool]] = {
+    "createPenalty": (API.post.createPenalty, False),
+    "createBonus": (API.post.createBonus, False),
+    "placePlayer": (API.post.placePlayer, True),
+    "updateDiscord": (API.post.updateDiscord, True),
+}
+
+IDEMPOTENT_OPERATIONS = {name for name, (_, idempotent) in OUTBOX_OPERATIONS.items() if idempotent}
+
+class OutboxRetryException(Exception):
+    """Raised when a mutation failed because of the website rather than the
+    mutation itself, so it should be sent again later."""
+
+async def _sendMutation(credentials: WebsiteCredentials, operation: str, arguments: dict) -> tuple[Any, str | None]:
+    function, _ = OUTBOX_OPERATIONS[operation]
+    with record_statuses() as statuses:
+        result, error = await function(credentials, **arguments)
+    if result:
+        return result, None
+    # decide from this mutation's own response: 5xx and 429 mean the website couldn't
+    # handle it right now, anything else means it rejected the mutation itself
+    status = statuses[-1] if statuses else None
+    if status is not None and (status >= 500 or status in RETRYABLE_STATUSES):
+        raise OutboxRetryException(f"{status} - {error}")
+    return None, str(error) if error else f"Rejected by the website ({status})"
+
+async def sendMutation(credentials: WebsiteCredentials, operation: str, arguments: dict) -> str | None:
+    """Sends a mutation from the outbox. Returns None if it succeeded or the error if the website rejected it.
+    Raises OutboxRetryException, aiohttp.ClientError or asyncio.TimeoutError if it should be tried again later."""
+    _, error = await _sendMutation(credentials, operation, arguments)
+    return error
+
+async def sendMutations(credentials: WebsiteCredentials, operation: str, arguments: list[dict],
+                        concurrency: int = DEFAULT_CONCURRENCY) -> list[tuple[Any, str | None, bool]]:
+    """Sends mutations straight away instead of queueing them, with at most `concurrency` in flight.
+    Returns the (result, error, retry) of each mutation in the same order as the input, where retry
+    means the website was unavailable rather than rejecting it, so it should be queued in the outbox."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def send(mutation_arguments: dict) -> tuple[Any, str | None, bool]:
+        async with semaphore:
+            try:
+                result, error = await _sendMutation(credentials, operation, mutation_arguments)
+                return result, error, False
+            except (OutboxRetryException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return None, f"{type(e).__name__}: {e}", True
+
+    return list(await asyncio.gather(*[send(a) for a in arguments]))
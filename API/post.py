@@ -1,36 +1,43 @@
+import asyncio
 import aiohttp
+from API.request import request, IDEMPOTENT_POLICY, SLOW_POLICY
+from API.schemas import decode_bonus, decode_name_change, decode_penalty, decode_penalty_request, decode_player, decode_table
+from API.cache import invalidate_player, clear_player_cache, get_table_cache
 import urllib.parse
-import asyncio
-from models import TableBasic, Table, WebsiteCredentials, Player, NameChangeRequest, Penalty, Bonus, PlayerPlacement, PenaltyRequest
+from models import TableBasic, WebsiteCredentials, Player, PlayerPlacement
 from typing import Tuple
 
-headers = {'Content-type': 'application/json'}
+def _invalidate_new_player(credentials: WebsiteCredentials, name: str, mkcid: int, discordid: int | None):
+    # drop cached misses for the new player's name, MKC ID and discord ID
+    invalidate_player(credentials, "name", name)
+    if mkcid > 0:
+        invalidate_player(credentials, "mkcId", mkcid)
+    if discordid:
+        invalidate_player(credentials, "discordId", discordid)
 
 async def createBonus(credentials: WebsiteCredentials, name: str, amount: int):
     request_url = f"{credentials.url}/api/bonus/create?name={name}&amount={amount}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            bonus = Bonus.from_api_response(body)
-            return bonus, None
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    bonus = resp.decode(decode_bonus)
+    return bonus, None
 
 async def bonusMKC(credentials: WebsiteCredentials, mkc:int, amount:int):
     request_url = f"{credentials.url}/api/bonus/create?mkcId={mkc}&amount={amount}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            bonus = Bonus.from_api_response(body)
-            return bonus, None
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "mkcId", mkc)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    bonus = resp.decode(decode_bonus)
+    return bonus, None
 
 async def createPenalty(credentials: WebsiteCredentials, name: str, amount: int, isStrike: bool):
     request_url = f"{credentials.url}/api/penalty/create?name={name}&amount={amount}"
@@ -38,27 +45,26 @@ async def createPenalty(credentials: WebsiteCredentials, name: str, amount: int,
         request_url += f"&game={credentials.game}"
     if isStrike:
         request_url += "&isStrike=true"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url, headers=headers) as resp:
-            if resp.status == 404:
-                error = "Player not found"
-                return None, error
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            penalty = Penalty.from_api_response(body)
-            return penalty, None
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if resp.status == 404:
+        error = "Player not found"
+        return None, error
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    penalty = resp.decode(decode_penalty)
+    return penalty, None
 
 async def deletePenalty(credentials: WebsiteCredentials, pen_id: int):
     request_url = f"{credentials.url}/api/penalty?id={pen_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.delete(request_url,headers=headers) as resp:
-            if resp.status == 200:
-                return True, None
-            return False, resp.status
+    resp = await request(credentials, "DELETE", request_url)
+    clear_player_cache(credentials)
+    if resp.status == 200:
+        return True, None
+    return False, resp.status
 
 async def createNewPlayer(credentials: WebsiteCredentials, mkcid:int, name, discordid: int | None = None) -> Tuple[Player | None, str | None]:
     request_url = f"{credentials.url}/api/player/create?name={name}"
@@ -68,14 +74,13 @@ async def createNewPlayer(credentials: WebsiteCredentials, mkcid:int, name, disc
         request_url += f"&mkcid={mkcid}"
     if discordid:
         request_url += f"&discordId={discordid}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player, None
+    resp = await request(credentials, "POST", request_url)
+    _invalidate_new_player(credentials, name, mkcid, discordid)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    player = resp.decode(decode_player)
+    return player, None
 
 async def createPlayerWithMMR(credentials: WebsiteCredentials, mkcid:int, mmr:int, name: str, discordid: int | None = None) -> Tuple[Player | None, str | None]:
     request_url = f"{credentials.url}/api/player/create?name={name}&mmr={mmr}"
@@ -85,113 +90,117 @@ async def createPlayerWithMMR(credentials: WebsiteCredentials, mkcid:int, mmr:in
         request_url += f"&mkcid={mkcid}"
     if discordid:
         request_url += f"&discordId={discordid}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player, None
-        
+    resp = await request(credentials, "POST", request_url)
+    _invalidate_new_player(credentials, name, mkcid, discordid)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    player = resp.decode(decode_player)
+    return player, None
+    
 async def registerPlayer(credentials: WebsiteCredentials, name: str, mmr: int | None = None) -> Tuple[Player | None, str | None]:
     request_url = f"{credentials.url}/api/player/register?game={credentials.game}&name={name}"
     if mmr is not None:
         request_url += f"&mmr={mmr}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player, None
-        
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    player = resp.decode(decode_player)
+    return player, None
+    
 async def placePlayer(credentials: WebsiteCredentials, mmr:int, name:str, force=False):
     request_url = f"{credentials.url}/api/player/placement?name={name}&mmr={mmr}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
     if force:
         request_url += "&force=true"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            player = Player.from_api_response(body)
-            return player, None
-        
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    player = resp.decode(decode_player)
+    return player, None
+    
 async def placeManyPlayers(credentials: WebsiteCredentials, placements: list[PlayerPlacement]):
     request_url = f"{credentials.url}/api/player/bulkPlacement"
     if credentials.game:
         request_url += f"?game={credentials.game}"
     body = {"playerPlacements": [{"name": p.name, "mmr": p.mmr} for p in placements]}
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers,json=body) as resp:
-            if resp.status != 204:
-                error = await resp.text()
-                return False, error
-            return True, None
+    try:
+        resp = await request(credentials, "POST", request_url, json_body=body, policy=SLOW_POLICY)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        # the website may still be placing the players, so we can't tell if it worked
+        return False, f"{type(e).__name__}: {e} - check the website to see which players were placed before trying again"
+    finally:
+        clear_player_cache(credentials)
+    if resp.status != 204:
+        error = resp.text()
+        return False, error
+    return True, None
 
 async def updatePlayerName(credentials: WebsiteCredentials, oldName: str, newName: str):
     request_url = f"{credentials.url}/api/player/update/name?name={oldName}&newName={newName}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status == 204:
-                return None
-            if resp.status == 404:
-                return("User with the current name doesn't exist")
-            if resp.status == 400:
-                return("User with that new name already exists")
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", oldName)
+    invalidate_player(credentials, "name", newName)
+    if resp.status == 204:
+        return None
+    if resp.status == 404:
+        return("User with the current name doesn't exist")
+    if resp.status == 400:
+        return("User with that new name already exists")
 
 async def updateMKCid(credentials: WebsiteCredentials, name, newID):
     request_url = f"{credentials.url}/api/player/update/mkcId?name={name}&newMkcId={newID}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status == 404:
-                return("Could not find user specified")
-            if resp.status != 204:
-                return await resp.text()
-            return True          
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    invalidate_player(credentials, "mkcId", newID)
+    if resp.status == 404:
+        return("Could not find user specified")
+    if resp.status != 204:
+        return resp.text()
+    return True          
 
 async def deleteTable(credentials: WebsiteCredentials, table_id: int):
     request_url = f"{credentials.url}/api/table?tableId={table_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.delete(request_url,headers=headers) as resp:
-            if resp.status == 200:
-                return True
-            return resp.status
-        
+    resp = await request(credentials, "DELETE", request_url)
+    clear_player_cache(credentials)
+    get_table_cache(credentials).invalidate(table_id)
+    if resp.status == 200:
+        return True
+    return resp.status
+    
 async def createTable(credentials: WebsiteCredentials, table: TableBasic):
     request_url = f"{credentials.url}/api/table/create?"
     if credentials.game:
         request_url += f"game={credentials.game}"
     body = table.to_submission_format()
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers,json=body) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            returnjson = await resp.json()
-            table = Table.from_api_response(returnjson)
-            return table, None
+    resp = await request(credentials, "POST", request_url, json_body=body)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    table = resp.decode(decode_table)
+    get_table_cache(credentials).put(table)
+    return table, None
 
 async def setMultipliers(credentials: WebsiteCredentials, table_id: int, multipliers):
     request_url = f"{credentials.url}/api/table/setMultipliers?tableId={table_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers,json=multipliers) as resp:
-            if resp.status != 200:
-                return(await resp.text())
-            return True
+    resp = await request(credentials, "POST", request_url, json_body=multipliers)
+    get_table_cache(credentials).invalidate(table_id)
+    if resp.status != 200:
+        return(resp.text())
+    return True
 
 async def setScores(credentials: WebsiteCredentials, table_id: int, scores: dict[str, list[int]]):
     request_url = f"{credentials.url}/api/table/setScores?tableId={table_id}"
@@ -203,169 +212,160 @@ async def setScores(credentials: WebsiteCredentials, table_id: int, scores: dict
             body[name] = sum(gp_scores)
         else:
             body[name] = gp_scores
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers,json=body) as resp:
-            if resp.status != 200:
-                return(await resp.text())
-            return True
+    resp = await request(credentials, "POST", request_url, json_body=body)
+    get_table_cache(credentials).invalidate(table_id)
+    if resp.status != 200:
+        return(resp.text())
+    return True
 
 async def setTableMessageId(credentials: WebsiteCredentials, table_id:int, msg_id:int):
     request_url = f"{credentials.url}/api/table/setTableMessageId?tableId={table_id}&tableMessageId={msg_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            return
+    resp = await request(credentials, "POST", request_url)
+    if resp.status == 200:
+        get_table_cache(credentials).update(table_id, table_message_id=msg_id)
+    else:
+        get_table_cache(credentials).invalidate(table_id)
 
 async def setUpdateMessageId(credentials: WebsiteCredentials, table_id:int, msg_id:int):
     request_url = f"{credentials.url}/api/table/setUpdateMessageId?tableId={table_id}&updateMessageId={msg_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            return
+    resp = await request(credentials, "POST", request_url)
+    if resp.status == 200:
+        get_table_cache(credentials).update(table_id, update_message_id=msg_id)
+    else:
+        get_table_cache(credentials).invalidate(table_id)
 
 async def verifyTable(credentials: WebsiteCredentials, table_id:int):
     request_url = f"{credentials.url}/api/table/verify?tableId={table_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        error_msg = None
-        for _ in range(5):
-            async with session.post(request_url,headers=headers) as resp:
-                if resp.status != 200:
-                    resp_text = await resp.text()
-                    error_msg = f"{resp.status} - {resp_text}"
-                    await asyncio.sleep(10)
-                    continue
-                body = await resp.json()
-                table = Table.from_api_response(body)
-                return table, None
-        return None, error_msg
+    # the website can fail to verify a table while other tables are being
+    # verified, so retry with backoff instead of failing the whole update
+    resp = await request(credentials, "POST", request_url, policy=IDEMPOTENT_POLICY)
+    if resp.status != 200:
+        return None, f"{resp.status} - {resp.text()}"
+    table = resp.decode(decode_table)
+    get_table_cache(credentials).put(table)
+    # everyone on the table has a new MMR now
+    for team in table.teams:
+        for score in team.scores:
+            invalidate_player(credentials, "id", score.player.id)
+    return table, None
 
 async def updateDiscord(credentials: WebsiteCredentials, name, discord_id:int):
     request_url = f"{credentials.url}/api/player/update/discordId?name={name}&newDiscordId={discord_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.text()
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    invalidate_player(credentials, "discordId", discord_id)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.text()
 
 async def hidePlayer(credentials: WebsiteCredentials, name):
     request_url = f"{credentials.url}/api/player/hide?name={name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.text()
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.text()
 
 async def unhidePlayer(credentials: WebsiteCredentials, name):
     request_url = f"{credentials.url}/api/player/unhide?name={name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.text()
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.text()
 
 async def refreshPlayerData(credentials: WebsiteCredentials, name):
     request_url = f"{credentials.url}/api/player/refreshRegistryData?name={name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.text()
+    resp = await request(credentials, "POST", request_url)
+    invalidate_player(credentials, "name", name)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.text()
 
 async def requestNameChange(credentials: WebsiteCredentials, old_name, new_name):
     request_url = f"{credentials.url}/api/player/requestNameChange?name={old_name}&newName={new_name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.json()
+    resp = await request(credentials, "POST", request_url)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.json()
 
 async def setNameChangeMessageId(credentials: WebsiteCredentials, current_name, message_id):
     request_url = f"{credentials.url}/api/player/setNameChangeMessageId?name={current_name}&messageId={message_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url, headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return False, error_msg
-            return True, await resp.text()
+    resp = await request(credentials, "POST", request_url)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return False, error_msg
+    return True, resp.text()
 
 async def acceptNameChange(credentials: WebsiteCredentials, current_name: str):
     request_url = f"{credentials.url}/api/player/acceptNameChange?name={current_name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        error_msg = None
-        for _ in range(5):
-            async with session.post(request_url, headers=headers) as resp:
-                if int(resp.status/100) != 2:
-                    resp_text = await resp.text()
-                    error_msg = f"{resp.status} - {resp_text}"
-                    await asyncio.sleep(10)
-                    continue
-                body = await resp.json()
-                name_change = NameChangeRequest.from_api_response(body)
-                return name_change, None
-        return None, error_msg
+    resp = await request(credentials, "POST", request_url, policy=IDEMPOTENT_POLICY)
+    invalidate_player(credentials, "name", current_name)
+    if int(resp.status/100) != 2:
+        return None, f"{resp.status} - {resp.text()}"
+    name_change = resp.decode(decode_name_change)
+    invalidate_player(credentials, "name", name_change.new_name)
+    return name_change, None
 
 async def rejectNameChange(credentials: WebsiteCredentials, current_name: str):
     request_url = f"{credentials.url}/api/player/rejectNameChange?name={current_name}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url, headers=headers) as resp:
-            if int(resp.status/100) != 2:
-                resp_text = await resp.text()
-                error_msg = f"{resp.status} - {resp_text}"
-                return None, error_msg
-            body = await resp.json()
-            name_change = NameChangeRequest.from_api_response(body)
-            return name_change, None
+    resp = await request(credentials, "POST", request_url)
+    if int(resp.status/100) != 2:
+        resp_text = resp.text()
+        error_msg = f"{resp.status} - {resp_text}"
+        return None, error_msg
+    name_change = resp.decode(decode_name_change)
+    return name_change, None
 
 async def createPenaltyRequest(credentials: WebsiteCredentials, penalty_name: str, player_name: str, reporter_name: str, tab_id: int, number_of_races=0):
     request_url = f"{credentials.url}/api/penaltyrequest/create?penaltyType={urllib.parse.quote(penalty_name)}&playerName={player_name}&reporterName={reporter_name}&tableID={tab_id}&numberOfRaces={number_of_races}"
     if credentials.game:
         request_url += f"&game={credentials.game}"    
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.post(request_url,headers=headers) as resp:
-            if resp.status != 201:
-                error = await resp.text()
-                return None, error
-            body = await resp.json()
-            request = PenaltyRequest.from_api_response(body)
-            return request, None
+    resp = await request(credentials, "POST", request_url)
+    if resp.status != 201:
+        error = resp.text()
+        return None, error
+    penalty_request = resp.decode(decode_penalty_request)
+    return penalty_request, None
 
 async def deletePenaltyRequest(credentials: WebsiteCredentials, request_id: int):
     request_url = f"{credentials.url}/api/penaltyrequest?id={request_id}"
     if credentials.game:
         request_url += f"&game={credentials.game}"
-    async with aiohttp.ClientSession(auth=aiohttp.BasicAuth(credentials.username, credentials.password)) as session:
-        async with session.delete(request_url,headers=headers) as resp:
-            if resp.status == 200:
-                return None
-            return resp.status
\ No newline at end of file
+    resp = await request(credentials, "DELETE", request_url)
+    if resp.status == 200:
+        return None
+    return resp.status
\ No newline at end of file
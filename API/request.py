@@ -0,0 +1,287 @@
+import aiohttp
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, TypeVar
+from multidict import CIMultiDictProxy
+from models import WebsiteCredentials, MKCentralCredentials
+from API.session import get_session, credentials_key
+from API.limiter import wait_for_turn
+from API.breaker import OUTAGE_STATUSES, get_breaker
+from API.stats import endpoint_name, record_response, record_decode, count_objects
+
+# aiohttp decompresses gzip and deflate responses by itself
+headers = {'Content-type': 'application/json', 'Accept-Encoding': 'gzip, deflate'}
+
+# status codes where trying the same request again later can succeed
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# methods which can't cause duplicate changes on the website if they're sent twice.
+# a retried DELETE can find that an earlier attempt already deleted it, so _send counts that 404 as success
+SAFE_METHODS = {"GET", "HEAD", "DELETE"}
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.2
+    max_delay: float = 5.0
+    # total time in seconds we are willing to spend on one call, including retries
+    deadline: float = 30.0
+    # set for POST endpoints that are safe to send more than once
+    idempotent: bool = False
+
+    def backoff(self, attempt: int) -> float:
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+DEFAULT_POLICY = RetryPolicy()
+IDEMPOTENT_POLICY = RetryPolicy(max_attempts=6, deadline=60.0, idempotent=True)
+# requests which make the website do a lot of work, like placing a whole season of players at once,
+# get the same 5 minutes that aiohttp allows by default, since they can't be retried if they time out
+SLOW_POLICY = RetryPolicy(deadline=300.0)
+
+# GET requests which are currently waiting for a response, so that identical
+# requests made at the same time can share it instead of hitting the website again
+_in_flight: dict[tuple, asyncio.Task] = {}
+
+T = TypeVar("T")
+
+@dataclass
+class APIResponse:
+    status: int
+    headers: CIMultiDictProxy[str]
+    body: bytes
+    # decoded versions of the body by decoder, so that it is only decoded once per caller
+    decoded: dict[Callable, Any] = field(default_factory=dict)
+    not_modified: bool = False
+    # method and path, for the stats
+    endpoint: str = ""
+
+    def json(self) -> Any:
+        return self.decode(json.loads)
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def decode(self, decoder: Callable[[bytes], T]) -> T:
+        """Decodes the body with decoder, only once per response."""
+        if decoder not in self.decoded:
+            start = time.perf_counter()
+            decoded = decoder(self.body)
+            record_decode(self.endpoint, time.perf_counter() - start, count_objects(decoded))
+            self.decoded[decoder] = decoded
+        return self.decoded[decoder]
+
+@dataclass
+class _Validated:
+    """The last 200 response to a conditional GET, with the validators to send next time."""
+    etag: str | None
+    last_modified: str | None
+    response: APIResponse
+
+    def conditions(self) -> dict[str, str]:
+        conditions = {}
+        if self.etag is not None:
+            conditions["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            conditions["If-Modified-Since"] = self.last_modified
+        return conditions
+
+_validated: dict[tuple, _Validated] = {}
+
+# set inside record_statuses, to collect the status of every response received
+_statuses: ContextVar[list[int] | None] = ContextVar("response_statuses", default=None)
+
+@contextmanager
+def record_statuses():
+    """Collects the status of every response received by API calls made inside this block
+    (after retries), so that the caller of an API function can tell why it failed."""
+    statuses: list[int] = []
+    token = _statuses.set(statuses)
+    try:
+        yield statuses
+    finally:
+        _statuses.reset(token)
+
+def _retry_after(resp_headers: CIMultiDictProxy[str]) -> float | None:
+    value = resp_headers.get("Retry-After", None)
+    if value is None:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _should_retry(policy: RetryPolicy, method: str, status: int | None) -> bool:
+    # a 429 means the request was never processed, so it's always safe to try again
+    if status == 429:
+        return True
+    if method not in SAFE_METHODS and not policy.idempotent:
+        return False
+    return status is None or status in RETRYABLE_STATUSES
+
+def _forget_in_flight(key: tuple, task: asyncio.Task):
+    if _in_flight.get(key, None) is task:
+        del _in_flight[key]
+    # the callers may all have been cancelled, so mark the error as retrieved
+    if not task.cancelled():
+        task.exception()
+
+async def request(credentials: WebsiteCredentials | MKCentralCredentials, method: str, url: str, *,
+                  json_body: Any = None, policy: RetryPolicy = DEFAULT_POLICY, conditional: bool = False) -> APIResponse:
+    """Sends a request using the shared session for these credentials, retrying
+    transient failures with exponential backoff until the policy's deadline.
+    Concurrent identical GET requests are coalesced into a single request.
+
+    Conditional GETs send the ETag and Last-Modified of the previous response from
+    this URL, and if the website answers 304 the body of the previous response is
+    returned again (with not_modified set)."""
+    if method != "GET":
+        return await _send(credentials, method, url, json_body, policy)
+    key = (credentials_key(credentials), url, policy, conditional)
+    task = _in_flight.get(key, None)
+    if task is None:
+        if conditional:
+            task = asyncio.create_task(_send_conditional(credentials, url, policy))
+        else:
+            task = asyncio.create_task(_send(credentials, method, url, json_body, policy))
+        _in_flight[key] = task
+        task.add_done_callback(lambda t: _forget_in_flight(key, t))
+    # shielded so that one caller being cancelled doesn't cancel the request for everyone else
+    response = await asyncio.shield(task)
+    # every caller gets its own decoded objects, since they may modify them
+    return replace(response, decoded={})
+
+async def _send_conditional(credentials: WebsiteCredentials | MKCentralCredentials, url: str,
+                            policy: RetryPolicy) -> APIResponse:
+    key = (credentials_key(credentials), url)
+    previous = _validated.get(key, None)
+    request_headers = headers if previous is None else {**headers, **previous.conditions()}
+    response = await _send(credentials, "GET", url, None, policy, request_headers)
+    if response.status == 304 and previous is not None:
+        cached = previous.response
+        return APIResponse(cached.status, cached.headers, cached.body,
+                           not_modified=True, endpoint=cached.endpoint)
+    if response.status == 200:
+        etag = response.headers.get("ETag", None)
+        last_modified = response.headers.get("Last-Modified", None)
+        if etag is not None or last_modified is not None:
+            _validated[key] = _Validated(etag, last_modified, response)
+        else:
+            _validated.pop(key, None)
+    return response
+
+def _record_status(status: int):
+    statuses = _statuses.get()
+    if statuses is not None:
+        statuses.append(status)
+
+async def _send(credentials: WebsiteCredentials | MKCentralCredentials, method: str, url: str,
+                json_body: Any, policy: RetryPolicy, request_headers: dict[str, str] = headers) -> APIResponse:
+    session = get_session(credentials)
+    breaker = get_breaker(credentials) if isinstance(credentials, WebsiteCredentials) else None
+    endpoint = endpoint_name(method, url)
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        timeout = aiohttp.ClientTimeout(total=max(remaining, 1.0))
+        status = None
+        retry_after = None
+        is_probe = breaker is not None and breaker.before_request()
+        try:
+            if isinstance(credentials, WebsiteCredentials):
+                await wait_for_turn(credentials)
+            async with session.request(method, url, headers=request_headers, json=json_body, timeout=timeout) as resp:
+                body = await resp.read()
+                response = APIResponse(resp.status, resp.headers, body, endpoint=endpoint)
+                # Content-Length is the compressed size when the website compressed the body
+                record_response(endpoint, resp.content_length or len(body), len(body), resp.status == 304)
+                status = resp.status
+                retry_after = _retry_after(resp.headers)
+            if breaker is not None and status in OUTAGE_STATUSES:
+                breaker.record_failure()
+            elif breaker is not None:
+                breaker.record_success()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            response = None
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt + 1 >= policy.max_attempts or not _should_retry(policy, method, None):
+                raise
+        finally:
+            if breaker is not None and is_probe:
+                breaker.probe_finished()
+        if response is not None and method == "DELETE" and attempt > 0 and status == 404:
+            # an earlier attempt failed after the website had already deleted it
+            response = replace(response, status=200)
+            status = 200
+        if response is not None and not _should_retry(policy, method, status):
+            _record_status(response.status)
+            return response
+        attempt += 1
+        delay = policy.backoff(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if attempt >= policy.max_attempts or time.monotonic() + delay > deadline:
+            if response is None:
+                raise asyncio.TimeoutError(f"{method} {url} did not succeed before its deadline")
+            _record_status(response.status)
+            return response
+        await asyncio.sleep(delay)
+
+@asynccontextmanager
+async def stream(credentials: WebsiteCredentials | MKCentralCredentials, url: str, *,
+                 policy: RetryPolicy = DEFAULT_POLICY) -> AsyncIterator[aiohttp.ClientResponse]:
+    """GETs a response without reading its body, so large responses can be read in chunks
+    from resp.content. Failures are only retried before the response is handed over."""
+    session = get_session(credentials)
+    breaker = get_breaker(credentials) if isinstance(credentials, WebsiteCredentials) else None
+    deadline = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        # the body can take a while to arrive, so only time out if it stops arriving
+        timeout = aiohttp.ClientTimeout(total=None, connect=max(remaining, 1.0), sock_read=policy.deadline)
+        is_probe = breaker is not None and breaker.before_request()
+        try:
+            if isinstance(credentials, WebsiteCredentials):
+                await wait_for_turn(credentials)
+            resp = await session.get(url, headers=headers, timeout=timeout)
+            if breaker is not None and resp.status in OUTAGE_STATUSES:
+                breaker.record_failure()
+            elif breaker is not None:
+                breaker.record_success()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt + 1 >= policy.max_attempts:
+                raise
+            resp = None
+        finally:
+            if breaker is not None and is_probe:
+                breaker.probe_finished()
+        if resp is not None and not _should_retry(policy, "GET", resp.status):
+            break
+        attempt += 1
+        delay = policy.backoff(attempt)
+        retry_after = _retry_after(resp.headers) if resp is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if attempt >= policy.max_attempts or time.monotonic() + delay > deadline:
+            if resp is None:
+                raise asyncio.TimeoutError(f"GET {url} did not succeed before its deadline")
+            break
+        if resp is not None:
+            resp.release()
+        await asyncio.sleep(delay)
+    try:
+        yield resp
+    finally:
+        resp.release()
@@ -0,0 +1,328 @@
+import msgspec
+import urllib.parse
+from datetime import datetime
+from models import (Table, TableTeam, TableScore, PlayerBasic, Player, PlayerAllGames, PlayerDetailed,
+                    PlayerStats, PlayerMMRChange, PlayerNameChange, ListPlayer, Penalty, Bonus,
+                    NameChangeRequest, PenaltyRequest)
+
+# Wire formats of the Lounge API. Responses are decoded straight from the response bytes
+# into these structs and then converted into the dataclasses in models, so that we skip
+# building an intermediate dict for every object and parsing every date with dateutil.
+# strict=False lets us accept IDs which the website sends as strings.
+
+class TableScoreSchema(msgspec.Struct, rename="camel"):
+    player_id: int
+    player_name: str
+    multiplier: float
+    player_discord_id: str | int | None = None
+    player_country_code: str | None = None
+    prev_mmr: int | None = None
+    new_mmr: int | None = None
+    delta: int | None = None
+    score: int | None = None
+    scores: list[int] | None = None
+    is_new_peak_mmr: bool = False
+
+    def to_model(self) -> TableScore:
+        discord_id = str(self.player_discord_id) if self.player_discord_id is not None else None
+        player = PlayerBasic(self.player_id, self.player_name, discord_id, self.player_country_code)
+        if self.score is not None:
+            gp_scores = [self.score]
+        else:
+            gp_scores = self.scores or []
+        return TableScore(gp_scores, sum(gp_scores), self.multiplier, self.prev_mmr, self.new_mmr,
+                          self.delta, player, self.is_new_peak_mmr)
+
+class TableTeamSchema(msgspec.Struct, rename="camel"):
+    rank: int
+    scores: list[TableScoreSchema]
+
+class TableSchema(msgspec.Struct, rename="camel"):
+    id: int
+    season: int
+    tier: str
+    num_teams: int
+    created_on: datetime
+    author_id: int
+    teams: list[TableTeamSchema]
+    verified_on: datetime | None = None
+    deleted_on: datetime | None = None
+    table_message_id: int | None = None
+    update_message_id: int | None = None
+
+    def to_model(self) -> Table:
+        teams: list[TableTeam] = []
+        num_players = 0
+        for t in self.teams:
+            scores = [s.to_model() for s in t.scores]
+            num_players += len(scores)
+            scores.sort(key=lambda s: s.score, reverse=True)
+            teams.append(TableTeam(t.rank, scores))
+        size = int(num_players / self.num_teams)
+        return Table(size, self.tier, teams, self.author_id, None, self.id, self.season, self.created_on,
+                     self.verified_on, self.deleted_on, self.table_message_id, self.update_message_id)
+
+class PlayerSchema(msgspec.Struct, rename="camel"):
+    id: int
+    name: str
+    is_hidden: bool
+    discord_id: str | int | None = None
+    country_code: str | None = None
+    mkc_id: int | None = None
+    registry_id: int | None = None
+    switch_fc: str | None = None
+    mmr: int | None = None
+    max_mmr: int | None = None
+
+    def to_model(self) -> Player:
+        discord_id = str(self.discord_id) if self.discord_id is not None else None
+        return Player(self.id, self.name, discord_id, self.country_code, self.mkc_id, self.registry_id,
+                      self.switch_fc, self.is_hidden, self.mmr, self.max_mmr)
+
+class PlayerAllGamesSchema(msgspec.Struct, rename="camel"):
+    id: int
+    name: str
+    is_hidden: bool
+    registrations: list[str]
+    discord_id: str | int | None = None
+    country_code: str | None = None
+    mkc_id: int | None = None
+    registry_id: int | None = None
+    switch_fc: str | None = None
+
+    def to_model(self) -> PlayerAllGames:
+        discord_id = str(self.discord_id) if self.discord_id is not None else None
+        return PlayerAllGames(self.id, self.name, discord_id, self.country_code, self.mkc_id,
+                              self.registry_id, self.switch_fc, self.is_hidden, self.registrations)
+
+class PlayerMMRChangeSchema(msgspec.Struct, rename="camel"):
+    new_mmr: int
+    mmr_delta: int
+    reason: str
+    time: datetime
+    id: int | None = None
+    score: int | None = None
+    partner_scores: list[int] | None = None
+    partner_ids: list[int] | None = None
+    rank: int | None = None
+    tier: str | None = None
+    num_teams: int | None = None
+
+    def to_model(self) -> PlayerMMRChange:
+        return PlayerMMRChange(self.id, self.new_mmr, self.mmr_delta, self.reason, self.time, self.score,
+                               self.partner_scores, self.partner_ids, self.rank, self.tier, self.num_teams)
+
+class PlayerNameChangeSchema(msgspec.Struct, rename="camel"):
+    name: str
+    changed_on: datetime
+
+    def to_model(self) -> PlayerNameChange:
+        return PlayerNameChange(self.name, self.changed_on)
+
+class PlayerDetailedSchema(msgspec.Struct, rename="camel"):
+    player_id: int
+    name: str
+    is_hidden: bool
+    season: int
+    overall_rank: int
+    events_played: int
+    mmr_changes: list[PlayerMMRChangeSchema]
+    name_history: list[PlayerNameChangeSchema]
+    discord_id: str | int | None = None
+    country_code: str | None = None
+    mkc_id: int | None = None
+    registry_id: int | None = None
+    switch_fc: str | None = None
+    mmr: int | None = None
+    max_mmr: int | None = None
+    win_rate: float | None = None
+    wins_last_ten: int | None = None
+    losses_last_ten: int | None = None
+    gain_loss_last_ten: int | None = None
+    largest_gain: int | None = None
+    largest_gain_table_id: int | None = None
+    largest_loss: int | None = None
+    largest_loss_table_id: int | None = None
+    average_score: float | None = None
+    no_sq_average_score: float | None = msgspec.field(default=None, name="noSQAverageScore")
+    average_last_ten: float | None = None
+    partner_average: float | None = None
+    no_sq_partner_average: float | None = msgspec.field(default=None, name="noSQPartnerAverage")
+
+    def to_model(self) -> PlayerDetailed:
+        stats = PlayerStats(self.season, self.overall_rank, self.events_played, self.win_rate,
+                            self.wins_last_ten, self.losses_last_ten, self.gain_loss_last_ten,
+                            self.largest_gain, self.largest_gain_table_id, self.largest_loss,
+                            self.largest_loss_table_id, self.average_score, self.no_sq_average_score,
+                            self.average_last_ten, self.partner_average, self.no_sq_partner_average,
+                            [c.to_model() for c in self.mmr_changes])
+        discord_id = str(self.discord_id) if self.discord_id is not None else None
+        return PlayerDetailed(self.player_id, self.name, discord_id, self.country_code, self.mkc_id,
+                              self.registry_id, self.switch_fc, self.is_hidden, self.mmr, self.max_mmr,
+                              stats, [n.to_model() for n in self.name_history])
+
+class ListPlayerSchema(msgspec.Struct, rename="camel"):
+    id: int
+    name: str
+    mkc_id: int | None = None
+    mmr: int | None = None
+    discord_id: int | None = None
+    events_played: int = 0
+
+    def to_model(self) -> ListPlayer:
+        return ListPlayer(self.id, self.name, self.mkc_id, self.mmr, self.discord_id, self.events_played)
+
+class PlayerListSchema(msgspec.Struct, rename="camel"):
+    players: list[ListPlayerSchema]
+
+class PenaltySchema(msgspec.Struct, rename="camel"):
+    id: int
+    season: int
+    awarded_on: datetime
+    is_strike: bool
+    prev_mmr: int
+    new_mmr: int
+    amount: int
+    player_id: int
+    player_name: str
+
+    def to_model(self) -> Penalty:
+        return Penalty(self.id, self.season, self.awarded_on, self.is_strike, self.prev_mmr,
+                       self.new_mmr, self.amount, self.player_id, self.player_name)
+
+class BonusSchema(msgspec.Struct, rename="camel"):
+    id: int
+    season: int
+    awarded_on: datetime
+    prev_mmr: int
+    new_mmr: int
+    amount: int
+    player_id: int
+    player_name: str
+
+    def to_model(self) -> Bonus:
+        return Bonus(self.id, self.season, self.awarded_on, self.prev_mmr,
+                     self.new_mmr, self.amount, self.player_id, self.player_name)
+
+class NameChangeRequestSchema(msgspec.Struct, rename="camel"):
+    id: int
+    name: str
+    new_name: str
+    requested_on: datetime
+    message_id: int | None = None
+    discord_id: int | None = None
+
+    def to_model(self) -> NameChangeRequest:
+        return NameChangeRequest(self.id, self.name, self.new_name, self.requested_on,
+                                 self.message_id, self.discord_id)
+
+class NameChangeListSchema(msgspec.Struct, rename="camel"):
+    players: list[NameChangeRequestSchema]
+
+class PenaltyRequestSchema(msgspec.Struct, rename="camel"):
+    id: int
+    penalty_name: str
+    table_id: int
+    number_of_races: int
+    reporter_id: int
+    reporter_name: str
+    player_id: int
+    player_name: str
+
+    def to_model(self) -> PenaltyRequest:
+        return PenaltyRequest(self.id, urllib.parse.unquote(self.penalty_name), self.table_id,
+                              self.number_of_races, self.reporter_id, self.reporter_name,
+                              self.player_id, self.player_name)
+
+_table_decoder = msgspec.json.Decoder(TableSchema, strict=False)
+_table_list_decoder = msgspec.json.Decoder(list[TableSchema], strict=False)
+_player_decoder = msgspec.json.Decoder(PlayerSchema, strict=False)
+_player_all_games_decoder = msgspec.json.Decoder(PlayerAllGamesSchema, strict=False)
+_player_detailed_decoder = msgspec.json.Decoder(PlayerDetailedSchema, strict=False)
+_player_list_decoder = msgspec.json.Decoder(PlayerListSchema, strict=False)
+_penalty_decoder = msgspec.json.Decoder(PenaltySchema, strict=False)
+_penalty_list_decoder = msgspec.json.Decoder(list[PenaltySchema], strict=False)
+_bonus_decoder = msgspec.json.Decoder(BonusSchema, strict=False)
+_name_change_decoder = msgspec.json.Decoder(NameChangeRequestSchema, strict=False)
+_name_change_list_decoder = msgspec.json.Decoder(NameChangeListSchema, strict=False)
+_penalty_request_decoder = msgspec.json.Decoder(PenaltyRequestSchema, strict=False)
+_penalty_request_list_decoder = msgspec.json.Decoder(list[PenaltyRequestSchema], strict=False)
+
+def decode_table(body: bytes) -> Table:
+    return _table_decoder.decode(body).to_model()
+
+def decode_tables(body: bytes) -> list[Table]:
+    return [t.to_model() for t in _table_list_decoder.decode(body)]
+
+def decode_player(body: bytes) -> Player:
+    return _player_decoder.decode(body).to_model()
+
+def decode_player_all_games(body: bytes) -> PlayerAllGames:
+    return _player_all_games_decoder.decode(body).to_model()
+
+def decode_player_detailed(body: bytes) -> PlayerDetailed:
+    return _player_detailed_decoder.decode(body).to_model()
+
+def decode_player_list(body: bytes) -> list[ListPlayer]:
+    return [p.to_model() for p in _player_list_decoder.decode(body).players]
+
+def decode_penalty(body: bytes) -> Penalty:
+    return _penalty_decoder.decode(body).to_model()
+
+def decode_penalties(body: bytes) -> list[Penalty]:
+    return [p.to_model() for p in _penalty_list_decoder.decode(body)]
+
+def decode_bonus(body: bytes) -> Bonus:
+    return _bonus_decoder.decode(body).to_model()
+
+def decode_name_change(body: bytes) -> NameChangeRequest:
+    return _name_change_decoder.decode(body).to_model()
+
+def decode_name_changes(body: bytes) -> list[NameChangeRequest]:
+    return [c.to_model() for c in _name_change_list_decoder.decode(body).players]
+
+def decode_penalty_request(body: bytes) -> PenaltyRequest:
+    return _penalty_request_decoder.decode(body).to_model()
+
+def decode_penalty_requests(body: bytes) -> list[PenaltyRequest]:
+    return [r.to_model() for r in _penalty_request_list_decoder.decode(body)]
+
+class ArrayItemSplitter:
+    """Incrementally decodes the array in a JSON document shaped like {"players": [{...}, {...}]}
+    as the document arrives in chunks, so only the unfinished tail of the array is kept in
+    memory. Each chunk is cut at the last '}' which leaves a valid list of items; a '}' inside
+    a string or a nested object can't, so msgspec does the scanning for us."""
+    def __init__(self, item_type: type):
+        self.decoder = msgspec.json.Decoder(list[item_type], strict=False)
+        self.buffer = b""
+        self.started = False
+
+    def feed(self, chunk: bytes) -> list:
+        buf = self.buffer + chunk
+        if not self.started:
+            start = buf.find(b"[")
+            if start < 0:
+                self.buffer = buf
+                return []
+            buf = buf[start+1:]
+            self.started = True
+        buf = buf.lstrip(b" \t\r\n,")
+        end = len(buf)
+        while True:
+            end = buf.rfind(b"}", 0, end)
+            if end < 0:
+                self.buffer = buf
+                return []
+            try:
+                items = self.decoder.decode(b"[" + buf[:end+1] + b"]")
+            except msgspec.ValidationError:
+                raise
+            except msgspec.DecodeError:
+                continue
+            self.buffer = buf[end+1:]
+            return items
+
+    def close(self):
+        """Checks that the whole array arrived."""
+        if not self.started or not self.buffer.lstrip(b" \t\r\n,").startswith(b"]"):
+            raise msgspec.DecodeError("JSON array ended early")
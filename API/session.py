@@ -0,0 +1,42 @@
+import aiohttp
+from models import WebsiteCredentials, MKCentralCredentials, BotConfig
+
+# one keep-alive connection pool per website login (and one for MKCentral),
+# so that consecutive API calls reuse TCP/TLS connections instead of
+# opening a new session for every request
+_sessions: dict[tuple[str, ...], aiohttp.ClientSession] = {}
+
+def credentials_key(credentials: WebsiteCredentials | MKCentralCredentials) -> tuple[str, ...]:
+    if isinstance(credentials, WebsiteCredentials):
+        return (credentials.url, credentials.username, credentials.password)
+    return (credentials.url,)
+
+def _create_session(credentials: WebsiteCredentials | MKCentralCredentials):
+    connector = aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60)
+    if isinstance(credentials, WebsiteCredentials):
+        auth = aiohttp.BasicAuth(credentials.username, credentials.password)
+        return aiohttp.ClientSession(auth=auth, connector=connector)
+    return aiohttp.ClientSession(connector=connector)
+
+def get_session(credentials: WebsiteCredentials | MKCentralCredentials) -> aiohttp.ClientSession:
+    key = credentials_key(credentials)
+    session = _sessions.get(key, None)
+    # sessions are normally opened at startup, but create one lazily
+    # if this is a website we haven't seen yet or the old one was closed
+    if session is None or session.closed:
+        session = _create_session(credentials)
+        _sessions[key] = session
+    return session
+
+async def open_sessions(config: BotConfig):
+    get_session(config.mkc_credentials)
+    for server in config.servers.values():
+        for lb in server.leaderboards.values():
+            get_session(lb.website_credentials)
+
+async def close_sessions():
+    sessions = list(_sessions.values())
+    _sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
@@ -0,0 +1,60 @@
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+@dataclass
+class EndpointStats:
+    requests: int = 0
+    not_modified: int = 0
+    # bytes as sent over the network (compressed, if the website compressed them)
+    # and after decompressing
+    wire_bytes: int = 0
+    body_bytes: int = 0
+    decodes: int = 0
+    decode_seconds: float = 0.0
+    objects: int = 0
+
+_stats: dict[str, EndpointStats] = {}
+_ID_IN_PATH = re.compile(r"\d+")
+_since = time.time()
+
+def endpoint_name(method: str, url: str) -> str:
+    """Groups requests by method and path, so /api/player?name=a and ?name=b count as one
+    endpoint. IDs in the path are replaced too, so all table images count as one endpoint."""
+    return f"{method} {_ID_IN_PATH.sub('{id}', urlsplit(url).path)}"
+
+def _endpoint(endpoint: str) -> EndpointStats:
+    stats = _stats.get(endpoint, None)
+    if stats is None:
+        stats = EndpointStats()
+        _stats[endpoint] = stats
+    return stats
+
+def record_response(endpoint: str, wire_bytes: int, body_bytes: int, not_modified: bool = False):
+    stats = _endpoint(endpoint)
+    stats.requests += 1
+    stats.wire_bytes += wire_bytes
+    stats.body_bytes += body_bytes
+    if not_modified:
+        stats.not_modified += 1
+
+def record_decode(endpoint: str, seconds: float, objects: int):
+    stats = _endpoint(endpoint)
+    stats.decodes += 1
+    stats.decode_seconds += seconds
+    stats.objects += objects
+
+def count_objects(decoded) -> int:
+    if isinstance(decoded, (list, tuple)):
+        return len(decoded)
+    return 0 if decoded is None else 1
+
+def get_stats() -> tuple[float, dict[str, EndpointStats]]:
+    """Returns the unix time the stats were last reset and the stats of each endpoint."""
+    return _since, dict(_stats)
+
+def reset_stats():
+    global _since
+    _stats.clear()
+    _since = time.time()
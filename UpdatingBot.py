@@ -3,9 +3,11 @@ from discord.ext import commands
 from discord import app_commands
 import logging
 import asyncio
+import mmrTables
 from util import LeaderboardNotFoundException, GuildNotFoundException, get_config, Translator
 from models import UpdatingBot
 from database import DBWrapper
+from API.breaker import WebsiteUnavailableException
 
 config = get_config('./config.json')
 
@@ -24,7 +26,8 @@ bot = UpdatingBot(config, db_wrapper, command_prefix=config.get_prefixes(), case
 print(bot.command_prefix)
 
 initial_extensions = ['cogs.Updating', 'cogs.Tables', 'cogs.Admin', 'cogs.Restrictions', 'cogs.Make_table', 'cogs.Players', 
-                      'cogs.Names', 'cogs.Penalties', 'cogs.Bonuses', 'cogs.Reactions', 'cogs.Requests', 'cogs.Verification']
+                      'cogs.Names', 'cogs.Penalties', 'cogs.Bonuses', 'cogs.Reactions', 'cogs.Requests', 'cogs.Verification',
+                      'cogs.PlayerSync', 'cogs.Outbox']
 #initial_extensions = ['cogs.Admin',]
 
 @bot.event
@@ -66,6 +69,9 @@ async def on_command_error(ctx: commands.Context[UpdatingBot], error: commands.C
     if isinstance(error, GuildNotFoundException):
         await(await ctx.send("You cannot use this command in this server!")).delete(delay=10)
         return
+    if isinstance(error, commands.CommandInvokeError) and isinstance(error.original, WebsiteUnavailableException):
+        await ctx.send(str(error.original))
+        return
     raise error
 
 @bot.tree.error
@@ -84,15 +90,29 @@ async def on_app_command_error(interaction:discord.Interaction, error):
         await interaction.response.send_message("You need one of the following roles to use this command: `%s`"
                              % (", ".join([str(r) for r in error.missing_roles])))
         return
+    if isinstance(error, app_commands.CommandInvokeError) and isinstance(error.original, WebsiteUnavailableException):
+        # the command may have already deferred or responded before the website stopped responding
+        if interaction.response.is_done():
+            await interaction.followup.send(str(error.original))
+        else:
+            await interaction.response.send_message(str(error.original))
+        return
     raise error
 
 async def main():
-    async with bot:
-        await bot.db_wrapper.create_all_tables()
-        await bot.tree.set_translator(Translator.CustomTranslator())
-        for extension in initial_extensions:
-            await bot.load_extension(extension)
-        await bot.start(bot.config.token)
-        await bot.tree.sync()
+    # the render processes are forked from this one, so start them before anything starts a thread
+    mmrTables.start_render_pool(bot.config.render_workers)
+    mmrTables.configure_render_cache(bot.config.render_cache_megabytes * 1024 * 1024, bot.config.render_cache_directory,
+                                     bot.config.render_cache_disk_megabytes * 1024 * 1024)
+    try:
+        async with bot:
+            await bot.db_wrapper.create_all_tables()
+            await bot.tree.set_translator(Translator.CustomTranslator())
+            for extension in initial_extensions:
+                await bot.load_extension(extension)
+            await bot.start(bot.config.token)
+            await bot.tree.sync()
+    finally:
+        mmrTables.stop_render_pool()
 
 asyncio.run(main())
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable
+from models import WebsiteCredentials
+from API.session import close_sessions
+from API.stats import get_stats
+import API.get, API.post
+from benchmarks.mock_lounge import MockLounge, MockSettings
+
+# Measures the throughput and latency of the API client functions against the mock
+# Lounge website. Run with `python -m benchmarks.api_benchmark` from the repository root.
+
+@dataclass
+class ScenarioResult:
+    name: str
+    calls: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+    server_requests: int
+    # 304 responses and KB of response bodies sent by the mock server
+    not_modified: int
+    server_kb: float
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def run_scenario(name: str, lounge: MockLounge, calls: int, concurrency: int,
+                       call: Callable[[int], Awaitable[bool]]) -> ScenarioResult:
+    """Runs call(i) for i in range(calls) with `concurrency` calls in flight at once.
+    call should return False if the client function reported an error."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(calls))
+    server_before = sum(lounge.requests.values())
+    not_modified_before = sum(lounge.not_modified.values())
+    bytes_before = sum(lounge.bytes_sent.values())
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return ScenarioResult(name, calls, errors, round(elapsed, 4), round(calls / elapsed, 1),
+                          round(_percentile(latencies, 50) * 1000, 2), round(_percentile(latencies, 99) * 1000, 2),
+                          sum(lounge.requests.values()) - server_before,
+                          sum(lounge.not_modified.values()) - not_modified_before,
+                          round((sum(lounge.bytes_sent.values()) - bytes_before) / 1024, 1))
+
+def _scenarios(lounge: MockLounge, credentials: WebsiteCredentials):
+    players = list(lounge.players.values())
+    table_ids = list(lounge.tables.keys())
+
+    async def get_player(i: int):
+        # a different player every call, so the player cache doesn't hide the network cost
+        return await API.get.getPlayerFromLounge(credentials, players[i % len(players)]["id"]) is not None
+
+    async def get_player_repeated(i: int):
+        return await API.get.getPlayer(credentials, players[i % 10]["name"]) is not None
+
+    async def get_players_bulk(i: int):
+        names = [p["name"] for p in players[(i * 12) % len(players):][:12]]
+        results, _ = await API.get.getPlayers(credentials, names)
+        return all(results)
+
+    async def get_player_details(i: int):
+        return await API.get.getPlayerDetails(credentials, players[i % len(players)]["name"]) is not None
+
+    async def get_table(i: int):
+        return await API.get.getTable(credentials, table_ids[i % len(table_ids)]) is not None
+
+    async def get_pending(i: int):
+        return await API.get.getPending(credentials) is not None
+
+    async def get_penalty_requests(i: int):
+        return await API.get.getPendingPenaltyRequests(credentials) is not None
+
+    async def get_player_list(i: int):
+        return await API.get.getPlayerList(credentials) is not None
+
+    async def create_bonus(i: int):
+        bonus, _ = await API.post.createBonus(credentials, players[i % len(players)]["name"], 1)
+        return bonus is not None
+
+    async def penalty_request(i: int):
+        # the same calls as reporting a penalty and then accepting or refusing it
+        created, _ = await API.post.createPenaltyRequest(credentials, "Repick", players[i % len(players)]["name"],
+                                                         players[(i + 1) % len(players)]["name"], table_ids[i % len(table_ids)])
+        if created is None or await API.get.getPenaltyRequest(credentials, created.id) is None:
+            return False
+        return await API.post.deletePenaltyRequest(credentials, created.id) is None
+
+    async def table_image(i: int):
+        return await API.get.downloadTableImage(credentials, table_ids[i % len(table_ids)]) is not None
+
+    return {
+        "getPlayerFromLounge": get_player,
+        "getPlayer (cached)": get_player_repeated,
+        "getPlayers x12": get_players_bulk,
+        "getPlayerDetails": get_player_details,
+        "getTable (cached)": get_table,
+        "getPending": get_pending,
+        "getPendingPenaltyRequests": get_penalty_requests,
+        "getPlayerList": get_player_list,
+        "createBonus": create_bonus,
+        "penalty request round trip": penalty_request,
+        "downloadTableImage": table_image,
+    }
+
+async def run(args) -> list[ScenarioResult]:
+    settings = MockSettings(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed,
+                            etags=not args.no_etags, compress=not args.no_compression)
+    lounge = MockLounge(args.players, args.tables, settings)
+    url = await lounge.start()
+    # the client side rate limiter is disabled unless asked for, so we measure the client itself
+    credentials = WebsiteCredentials(url, "bench", "bench", "mk8dx", requests_per_second=args.rate)
+    results: list[ScenarioResult] = []
+    try:
+        for name, call in _scenarios(lounge, credentials).items():
+            if args.scenario and not any(s.lower() in name.lower() for s in args.scenario):
+                continue
+            # the player list and pending tables are large, so run fewer of them
+            calls = args.calls if "List" not in name and "Pending" not in name else max(1, args.calls // 20)
+            results.append(await run_scenario(name, lounge, calls, args.concurrency, call))
+    finally:
+        await close_sessions()
+        await lounge.stop()
+    return results
+
+def print_results(results: list[ScenarioResult]):
+    print(f"{'scenario':<27}{'calls':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'server':>8}{'304s':>7}{'KB':>10}")
+    for r in results:
+        print(f"{r.name:<27}{r.calls:>7}{r.errors:>8}{r.throughput:>10}{r.p50_ms:>10}{r.p99_ms:>10}{r.server_requests:>8}"
+              f"{r.not_modified:>7}{r.server_kb:>10}")
+    if results:
+        print(f"median p50 across scenarios: {statistics.median(r.p50_ms for r in results)} ms")
+
+def print_client_stats():
+    _, stats = get_stats()
+    print(f"\n{'endpoint (client side)':<40}{'reqs':>7}{'wire KB':>10}{'body KB':>10}{'decode ms':>11}{'objects':>9}")
+    for endpoint, s in sorted(stats.items(), key=lambda e: e[1].wire_bytes, reverse=True):
+        print(f"{endpoint:<40}{s.requests:>7}{s.wire_bytes/1024:>10.1f}{s.body_bytes/1024:>10.1f}"
+              f"{s.decode_seconds*1000:>11.1f}{s.objects:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Lounge API client against a mock website")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds of latency added by the mock server")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--rate", type=float, default=0.0, help="client side requests per second (0 to disable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-etags", action="store_true", help="disable conditional GET support in the mock server")
+    parser.add_argument("--no-compression", action="store_true", help="disable response compression in the mock server")
+    parser.add_argument("--scenario", action="append", help="only run scenarios containing this text")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    print_results(results)
+    print_client_stats()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+
+if __name__ == "__main__":
+    main()
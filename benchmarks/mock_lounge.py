@@ -0,0 +1,456 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from aiohttp import web
+
+# smallest valid PNG, returned for every table image
+_PNG = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                     "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082")
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+@dataclass
+class MockSettings:
+    # seconds added to every response, plus up to `jitter` extra seconds
+    latency: float = 0.0
+    jitter: float = 0.0
+    # fraction of requests answered with `error_status` instead of being handled
+    error_rate: float = 0.0
+    error_status: int = 503
+    retry_after: int | None = None
+    seed: int = 0
+    # send ETags from the polling endpoints and answer matching If-None-Match headers with a 304
+    etags: bool = True
+    # compress large responses when the client accepts gzip or deflate
+    compress: bool = True
+
+@dataclass
+class MockLounge:
+    """In-memory stand-in for the Lounge API website, implementing the endpoints used by
+    API/get.py and API/post.py so the client can be measured without the real website."""
+    player_count: int = 1000
+    pending_table_count: int = 20
+    settings: MockSettings = field(default_factory=MockSettings)
+    season: int = 1
+
+    def __post_init__(self):
+        self.random = random.Random(self.settings.seed)
+        self.requests: Counter[str] = Counter()
+        # 304 responses and response body bytes (before compression) by path
+        self.not_modified: Counter[str] = Counter()
+        self.bytes_sent: Counter[str] = Counter()
+        self.players: dict[int, dict] = {}
+        self.tables: dict[int, dict] = {}
+        self.penalties: dict[int, dict] = {}
+        self.penalty_requests: dict[int, dict] = {}
+        self.name_changes: dict[int, dict] = {}
+        self._next_id = 1
+        for _ in range(self.player_count):
+            self.add_player(f"Player {self._next_id}", self.random.randint(0, 15000))
+        for _ in range(self.pending_table_count):
+            self.add_table(self.random.sample(list(self.players.values()), 12), size=2)
+        self.runner: web.AppRunner | None = None
+        self.url = ""
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def add_player(self, name: str, mmr: int | None, mkc_id: int | None = None, discord_id: int | None = None) -> dict:
+        player_id = self._new_id()
+        player = {
+            "id": player_id,
+            "name": name,
+            "mkcId": mkc_id if mkc_id is not None else player_id + 100000,
+            "registryId": player_id,
+            "discordId": str(discord_id if discord_id is not None else 10**17 + player_id),
+            "countryCode": "US",
+            "switchFc": f"{player_id:012d}"[:4] + "-" + f"{player_id:012d}"[4:8] + "-" + f"{player_id:012d}"[8:],
+            "isHidden": False,
+            "mmr": mmr,
+            "maxMmr": mmr,
+            "eventsPlayed": 0,
+        }
+        self.players[player_id] = player
+        return player
+
+    def add_table(self, players: list[dict], size: int, tier: str = "A", author_id: int = 1) -> dict:
+        table_id = self._new_id()
+        teams = []
+        for rank, start in enumerate(range(0, len(players), size)):
+            scores = [{
+                "playerId": p["id"],
+                "playerName": p["name"],
+                "playerDiscordId": p["discordId"],
+                "playerCountryCode": p["countryCode"],
+                "score": self.random.randint(20, 140),
+                "multiplier": 1.0,
+            } for p in players[start:start+size]]
+            teams.append({"rank": rank + 1, "scores": scores})
+        table = {
+            "id": table_id,
+            "season": self.season,
+            "createdOn": _now(),
+            "numTeams": len(teams),
+            "tier": tier,
+            "authorId": str(author_id),
+            "teams": teams,
+        }
+        self.tables[table_id] = table
+        return table
+
+    def find_player(self, query) -> dict | None:
+        if "id" in query:
+            return self.players.get(int(query["id"]), None)
+        for field_name, key in (("name", "name"), ("discordId", "discordId"), ("mkcId", "mkcId"), ("fc", "switchFc")):
+            if field_name in query:
+                value = query[field_name].strip().lower()
+                for player in self.players.values():
+                    if str(player[key]).lower() == value:
+                        return player
+                return None
+        return None
+
+    # --- middleware ---
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler):
+        self.requests[f"{request.method} {request.path}"] += 1
+        delay = self.settings.latency + self.random.uniform(0, self.settings.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.settings.error_rate and self.random.random() < self.settings.error_rate:
+            headers = {}
+            if self.settings.retry_after is not None:
+                headers["Retry-After"] = str(self.settings.retry_after)
+            return web.Response(status=self.settings.error_status, text="injected error", headers=headers)
+        resp = await handler(request)
+        if isinstance(resp, web.Response) and isinstance(resp.body, bytes):
+            self.bytes_sent[request.path] += len(resp.body)
+            if self.settings.compress and len(resp.body) > 1024:
+                resp.enable_compression()
+        return resp
+
+    def _polled_response(self, request: web.Request, body) -> web.Response:
+        """JSON response with an ETag, or a 304 if the client already has this body."""
+        data = json.dumps(body).encode()
+        if not self.settings.etags:
+            return web.Response(body=data, content_type="application/json")
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'
+        if request.headers.get("If-None-Match", None) == etag:
+            self.not_modified[request.path] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=data, content_type="application/json", headers={"ETag": etag})
+
+    # --- players ---
+
+    async def get_player(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        return web.json_response(player)
+
+    async def get_player_all_games(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        body = {k: v for k, v in player.items() if k not in ("mmr", "maxMmr", "eventsPlayed")}
+        body["registrations"] = ["mk8dx"]
+        return web.json_response(body)
+
+    async def get_player_details(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        body = {k: v for k, v in player.items() if k != "id"}
+        body.update({"playerId": player["id"], "season": self.season, "overallRank": player["id"],
+                     "mmrChanges": [], "nameHistory": []})
+        return web.json_response(body)
+
+    async def get_player_list(self, request: web.Request):
+        players = [{"id": p["id"], "name": p["name"], "mkcId": p["mkcId"], "mmr": p["mmr"],
+                    "discordId": p["discordId"], "eventsPlayed": p["eventsPlayed"]} for p in self.players.values()]
+        return web.json_response({"players": players})
+
+    async def create_player(self, request: web.Request):
+        name = request.query["name"]
+        if self.find_player({"name": name}) is not None:
+            return web.Response(status=400, text="Player already exists")
+        mmr = request.query.get("mmr", None)
+        mkc_id = request.query.get("mkcid", None)
+        discord_id = request.query.get("discordId", None)
+        player = self.add_player(name, int(mmr) if mmr is not None else None,
+                                 int(mkc_id) if mkc_id else None, int(discord_id) if discord_id else None)
+        return web.json_response(player, status=201)
+
+    async def place_player(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        player["mmr"] = player["maxMmr"] = int(request.query["mmr"])
+        return web.json_response(player, status=201)
+
+    async def bulk_place(self, request: web.Request):
+        body = await request.json()
+        for placement in body["playerPlacements"]:
+            player = self.find_player({"name": placement["name"]})
+            if player is not None:
+                player["mmr"] = player["maxMmr"] = placement["mmr"]
+        return web.Response(status=204)
+
+    async def update_name(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        if self.find_player({"name": request.query["newName"]}) is not None:
+            return web.Response(status=400)
+        player["name"] = request.query["newName"]
+        return web.Response(status=204)
+
+    async def update_discord(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        player["discordId"] = request.query["newDiscordId"]
+        return web.Response(status=200, text="")
+
+    async def set_hidden(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        player["isHidden"] = request.path.endswith("/hide")
+        return web.Response(status=200, text="")
+
+    # --- name changes ---
+
+    def _name_change_body(self, player_id: int) -> dict:
+        change = self.name_changes[player_id]
+        player = self.players[player_id]
+        return {"id": player_id, "name": player["name"], "newName": change["newName"],
+                "requestedOn": change["requestedOn"], "discordId": player["discordId"]}
+
+    async def get_pending_name_changes(self, request: web.Request):
+        return self._polled_response(request, {"players": [self._name_change_body(i) for i in self.name_changes]})
+
+    async def request_name_change(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        self.name_changes[player["id"]] = {"newName": request.query["newName"], "requestedOn": _now()}
+        return web.json_response(self._name_change_body(player["id"]))
+
+    async def resolve_name_change(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None or player["id"] not in self.name_changes:
+            return web.Response(status=404)
+        body = self._name_change_body(player["id"])
+        del self.name_changes[player["id"]]
+        if request.path.endswith("acceptNameChange"):
+            player["name"] = body["newName"]
+        return web.json_response(body)
+
+    # --- penalties and bonuses ---
+
+    def _adjust(self, player: dict, amount: int) -> dict:
+        prev_mmr = player["mmr"] or 0
+        player["mmr"] = max(0, prev_mmr + amount)
+        return {"id": self._new_id(), "season": self.season, "awardedOn": _now(), "prevMmr": prev_mmr,
+                "newMmr": player["mmr"], "amount": amount, "playerId": player["id"], "playerName": player["name"]}
+
+    async def create_penalty(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        penalty = self._adjust(player, -abs(int(request.query["amount"])))
+        penalty["isStrike"] = request.query.get("isStrike", "false") == "true"
+        self.penalties[penalty["id"]] = penalty
+        return web.json_response(penalty, status=201)
+
+    async def list_penalties(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        strikes_only = request.query.get("isStrike", "false") == "true"
+        return web.json_response([p for p in self.penalties.values()
+                                  if p["playerId"] == player["id"] and (p["isStrike"] or not strikes_only)])
+
+    async def delete_penalty(self, request: web.Request):
+        if self.penalties.pop(int(request.query["id"]), None) is None:
+            return web.Response(status=404)
+        return web.Response(status=200)
+
+    async def create_bonus(self, request: web.Request):
+        player = self.find_player(request.query)
+        if player is None:
+            return web.Response(status=404)
+        return web.json_response(self._adjust(player, abs(int(request.query["amount"]))), status=201)
+
+    # --- penalty requests ---
+
+    async def get_penalty_request(self, request: web.Request):
+        penalty_request = self.penalty_requests.get(int(request.query["id"]), None)
+        if penalty_request is None:
+            return web.Response(status=404)
+        return web.json_response(penalty_request)
+
+    async def list_penalty_requests(self, request: web.Request):
+        return self._polled_response(request, list(self.penalty_requests.values()))
+
+    async def create_penalty_request(self, request: web.Request):
+        player = self.find_player({"name": request.query["playerName"]})
+        reporter = self.find_player({"name": request.query["reporterName"]})
+        if player is None or reporter is None:
+            return web.Response(status=404)
+        penalty_request = {"id": self._new_id(), "penaltyName": request.query["penaltyType"],
+                           "tableId": int(request.query["tableID"]), "numberOfRaces": int(request.query.get("numberOfRaces", 0)),
+                           "reporterId": reporter["id"], "reporterName": reporter["name"],
+                           "playerId": player["id"], "playerName": player["name"]}
+        self.penalty_requests[penalty_request["id"]] = penalty_request
+        return web.json_response(penalty_request, status=201)
+
+    async def delete_penalty_request(self, request: web.Request):
+        if self.penalty_requests.pop(int(request.query["id"]), None) is None:
+            return web.Response(status=404)
+        return web.Response(status=200)
+
+    # --- tables ---
+
+    async def get_table(self, request: web.Request):
+        table = self.tables.get(int(request.query["tableId"]), None)
+        if table is None:
+            return web.Response(status=404)
+        return web.json_response(table)
+
+    async def get_unverified(self, request: web.Request):
+        return self._polled_response(request, [t for t in self.tables.values() if "verifiedOn" not in t])
+
+    async def create_table(self, request: web.Request):
+        body = await request.json()
+        players = []
+        for score in body["scores"]:
+            player = self.find_player({"name": score["playerName"]})
+            if player is None:
+                return web.Response(status=400, text=f"Player {score['playerName']} not found")
+            players.append(player)
+        size = len(players) // (max(s["team"] for s in body["scores"]) + 1)
+        table = self.add_table(players, size, body["tier"], int(body["authorId"]))
+        return web.json_response(table, status=201)
+
+    async def verify_table(self, request: web.Request):
+        table = self.tables.get(int(request.query["tableId"]), None)
+        if table is None:
+            return web.Response(status=404)
+        table["verifiedOn"] = _now()
+        for team in table["teams"]:
+            for score in team["scores"]:
+                player = self.players[score["playerId"]]
+                delta = self.random.randint(-100, 100)
+                score["prevMmr"] = player["mmr"] or 0
+                player["mmr"] = score["newMmr"] = max(0, score["prevMmr"] + delta)
+                score["delta"] = score["newMmr"] - score["prevMmr"]
+                player["eventsPlayed"] += 1
+        return web.json_response(table)
+
+    async def update_table(self, request: web.Request):
+        table = self.tables.get(int(request.query["tableId"]), None)
+        if table is None:
+            return web.Response(status=404)
+        if request.path.endswith("setTableMessageId"):
+            table["tableMessageId"] = request.query["tableMessageId"]
+        elif request.path.endswith("setUpdateMessageId"):
+            table["updateMessageId"] = request.query["updateMessageId"]
+        return web.Response(status=200)
+
+    async def delete_table(self, request: web.Request):
+        if self.tables.pop(int(request.query["tableId"]), None) is None:
+            return web.Response(status=404)
+        return web.Response(status=200)
+
+    async def table_image(self, request: web.Request):
+        table_id = int(request.match_info["table_id"])
+        if table_id not in self.tables:
+            return web.Response(status=404)
+        return web.Response(body=_PNG, content_type="image/png")
+
+    # --- server ---
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject])
+        app.router.add_get("/api/player", self.get_player)
+        app.router.add_get("/api/player/allgames", self.get_player_all_games)
+        app.router.add_get("/api/player/details", self.get_player_details)
+        app.router.add_get("/api/player/list", self.get_player_list)
+        app.router.add_get("/api/player/listPendingNameChanges", self.get_pending_name_changes)
+        app.router.add_post("/api/player/create", self.create_player)
+        app.router.add_post("/api/player/register", self.create_player)
+        app.router.add_post("/api/player/placement", self.place_player)
+        app.router.add_post("/api/player/bulkPlacement", self.bulk_place)
+        app.router.add_post("/api/player/update/name", self.update_name)
+        app.router.add_post("/api/player/update/discordId", self.update_discord)
+        app.router.add_post("/api/player/hide", self.set_hidden)
+        app.router.add_post("/api/player/unhide", self.set_hidden)
+        app.router.add_post("/api/player/requestNameChange", self.request_name_change)
+        app.router.add_post("/api/player/acceptNameChange", self.resolve_name_change)
+        app.router.add_post("/api/player/rejectNameChange", self.resolve_name_change)
+        app.router.add_get("/api/penalty/list", self.list_penalties)
+        app.router.add_post("/api/penalty/create", self.create_penalty)
+        app.router.add_delete("/api/penalty", self.delete_penalty)
+        app.router.add_post("/api/bonus/create", self.create_bonus)
+        app.router.add_get("/api/penaltyrequest", self.get_penalty_request)
+        app.router.add_get("/api/penaltyrequest/list", self.list_penalty_requests)
+        app.router.add_post("/api/penaltyrequest/create", self.create_penalty_request)
+        app.router.add_delete("/api/penaltyrequest", self.delete_penalty_request)
+        app.router.add_get("/api/table", self.get_table)
+        app.router.add_get("/api/table/unverified", self.get_unverified)
+        app.router.add_post("/api/table/create", self.create_table)
+        app.router.add_post("/api/table/verify", self.verify_table)
+        app.router.add_post("/api/table/setScores", self.update_table)
+        app.router.add_post("/api/table/setMultipliers", self.update_table)
+        app.router.add_post("/api/table/setTableMessageId", self.update_table)
+        app.router.add_post("/api/table/setUpdateMessageId", self.update_table)
+        app.router.add_delete("/api/table", self.delete_table)
+        app.router.add_get("/TableImage/{table_id:\\d+}.png", self.table_image)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        bound_port = self.runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+async def _serve(args):
+    settings = MockSettings(args.latency, args.jitter, args.error_rate, args.error_status, args.retry_after,
+                            etags=not args.no_etags, compress=not args.no_compression)
+    lounge = MockLounge(args.players, args.tables, settings)
+    url = await lounge.start(args.host, args.port)
+    print(f"Mock Lounge API running at {url}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock Lounge API website")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=int, default=None)
+    parser.add_argument("--no-etags", action="store_true", help="always send full responses from the polling endpoints")
+    parser.add_argument("--no-compression", action="store_true", help="never compress responses")
+    asyncio.run(_serve(parser.parse_args()))
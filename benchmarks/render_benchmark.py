@@ -0,0 +1,258 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from matplotlib import font_manager
+import matplotlib
+import PIL
+from models import (LeaderboardConfig, LeaderboardRank, PlayerCountSettings, WebsiteCredentials,
+                    Table, TableTeam, TableScore, PlayerBasic)
+import mmrTables
+
+# Measures how long each MMR table renderer takes to draw synthetic tables of every format, along with
+# CPU time, peak memory and the size of the PNGs. Runs offline; run with `python -m benchmarks.render_benchmark`
+# from the repository root. Each renderer and format is measured in its own forked process so that the
+# peak memory of one doesn't hide the next.
+
+FORMATS = {"FFA": 1, "2v2": 2, "3v3": 3, "4v4": 4, "6v6": 6}
+
+# roughly the ranks of the MK8DX leaderboard, so that tables have a realistic spread of colours and promotions
+RANKS = [
+    ("Iron", 0, "#817876"), ("Bronze", 2000, "#E67E22"), ("Silver", 4000, "#7D8396"),
+    ("Gold", 6000, "#F1C40F"), ("Platinum", 8000, "#3FABB8"), ("Sapphire", 10000, "#286CD3"),
+    ("Ruby", 11000, "#D51C5E"), ("Diamond", 12000, "#9CCBD6"), ("Master", 13000, "#0E0B0B"),
+    ("Grandmaster", 14500, "#A3022C"),
+]
+# the MMR that players in each tier are centred around
+TIER_MMRS = {"X": 14000, "S": 12000, "A": 10500, "AB": 9500, "B": 8500, "BC": 7500, "C": 6500,
+             "CD": 5500, "D": 4500, "DE": 3500, "E": 2500, "EF": 2000, "F": 1500, "FG": 1000, "G": 500}
+
+@dataclass
+class RenderResult:
+    renderer: str
+    format: str
+    iterations: int
+    # the first render, which includes loading fonts and building the template
+    cold_ms: float
+    wall_p50_ms: float
+    wall_p95_ms: float
+    wall_mean_ms: float
+    cpu_mean_ms: float
+    renders_per_second: float
+    # peak RSS of the process and how much it grew while rendering
+    peak_rss_mb: float
+    rss_growth_mb: float
+    png_kb: float
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def register_fonts():
+    """Adds the fonts in the repository to matplotlib if they aren't installed, as they
+    are in the Docker image, so the benchmark draws with the same font as the bot."""
+    names = {f.name for f in font_manager.fontManager.ttflist}
+    if "Titillium Web" in names:
+        return
+    for path in glob.glob(os.path.join(os.path.dirname(__file__), "..", "fonts", "*.ttf")):
+        font_manager.fontManager.addfont(path)
+
+def benchmark_leaderboard() -> LeaderboardConfig:
+    credentials = WebsiteCredentials("http://localhost", "bench", "bench", "mk8dx")
+    ranks = [LeaderboardRank(name, "", 0, color, "", mmr) for name, mmr, color in RANKS]
+    player_settings = {12: PlayerCountSettings(12, [1, 2, 3, 4, 6], {})}
+    return LeaderboardConfig("bench", credentials, 0, 0, 0, 0, 0, 0, 0, 0, 0, player_settings, {}, 12, 3,
+                             False, False, False, ranks, {}, None)
+
+def _player_name(rng: random.Random) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    name = rng.choice(letters).upper() + "".join(rng.choice(letters) for _ in range(rng.randint(2, 14)))
+    # some names have spaces, numbers or non-latin characters, like real ones do
+    roll = rng.random()
+    if roll < 0.15:
+        name = f"{name} {rng.choice(letters).upper()}{rng.choice(letters)}"
+    elif roll < 0.25:
+        name = f"{name}{rng.randint(1, 99)}"
+    elif roll < 0.3:
+        name = f"{name}{rng.choice('éüñøß')}"
+    return name[:16]
+
+def synthetic_table(size: int, rng: random.Random, table_id: int) -> Table:
+    """A verified 12 player table in a random tier, with team scores that add up like a real mogi,
+    MMR changes that follow the placements, some players crossing a rank boundary and some peaks."""
+    tier = rng.choice(list(TIER_MMRS))
+    boundaries = [mmr for _, mmr, _ in RANKS[1:]]
+    teams: list[TableTeam] = []
+    for _ in range(12 // size):
+        scores: list[TableScore] = []
+        for _ in range(size):
+            # 12 races of 1-15 points each, so 12-180 points per player
+            gp_scores = [sum(rng.randint(1, 15) for _ in range(4)) for _ in range(3)]
+            prev_mmr = max(0, int(rng.gauss(TIER_MMRS[tier], 600)))
+            player = PlayerBasic(rng.randint(1, 100000), _player_name(rng), None, None)
+            scores.append(TableScore(gp_scores, sum(gp_scores), 1.0, prev_mmr, None, None, player))
+        teams.append(TableTeam(0, scores))
+    teams.sort(key=lambda t: t.get_team_score(), reverse=True)
+    for i, team in enumerate(teams):
+        team.rank = i + 1
+        for score in team.scores:
+            # winners gain and losers lose, with some noise for the players' own MMR
+            expected = (len(teams) - 1) / 2 - i
+            delta = int(expected * 120 / max(1, len(teams) // 2) + rng.gauss(0, 25))
+            if delta == 0:
+                delta = 1
+            # move about one player in six next to a rank boundary so that this table changes their rank
+            if rng.random() < 0.15:
+                score.prev_mmr = rng.choice(boundaries) - delta // 2
+            assert score.prev_mmr is not None
+            score.delta = delta
+            score.new_mmr = max(0, score.prev_mmr + delta)
+            score.is_peak = delta > 0 and rng.random() < 0.2
+    created_on = datetime.now(timezone.utc)
+    return Table(size, tier, teams, None, None, table_id, 1, created_on, created_on, None, None, None)
+
+def run_renderer(renderer: str, format_name: str, iterations: int, seed: int) -> RenderResult:
+    rng = random.Random(f"{seed}-{format_name}")
+    lb = benchmark_leaderboard()
+    # the same 20 tables for any number of iterations, so that reports are comparable,
+    # with names and numbers varying like they would in the bot
+    tables = [synthetic_table(FORMATS[format_name], rng, i) for i in range(20)]
+    render = mmrTables.RENDERERS[renderer]
+    rss_before = _peak_rss_mb()
+
+    start = time.perf_counter()
+    png = render(mmrTables.describe_mmr_table(lb, tables[0]))
+    cold = time.perf_counter() - start
+
+    walls: list[float] = []
+    cpus: list[float] = []
+    sizes: list[int] = [len(png)]
+    for i in range(iterations):
+        table = tables[i % len(tables)]
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        png = render(mmrTables.describe_mmr_table(lb, table))
+        cpus.append(time.process_time() - cpu_start)
+        walls.append(time.perf_counter() - start)
+        sizes.append(len(png))
+    peak = _peak_rss_mb()
+    return RenderResult(renderer, format_name, iterations, round(cold * 1000, 2),
+                        round(_percentile(walls, 50) * 1000, 2), round(_percentile(walls, 95) * 1000, 2),
+                        round(statistics.mean(walls) * 1000, 2), round(statistics.mean(cpus) * 1000, 2),
+                        round(len(walls) / sum(walls), 1), round(peak, 1), round(peak - rss_before, 1),
+                        round(statistics.mean(sizes) / 1024, 1))
+
+def _run_in_child(renderer: str, format_name: str, iterations: int, seed: int, conn):
+    try:
+        conn.send(asdict(run_renderer(renderer, format_name, iterations, seed)))
+    finally:
+        conn.close()
+
+def run_isolated(renderer: str, format_name: str, iterations: int, seed: int) -> RenderResult:
+    """Runs the benchmark in a forked process, so its peak RSS only covers this renderer and format."""
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_in_child, args=(renderer, format_name, iterations, seed, sender))
+    process.start()
+    sender.close()
+    try:
+        result = RenderResult(**receiver.recv())
+    except EOFError:
+        raise RuntimeError(f"The {renderer} {format_name} benchmark process stopped without a result")
+    finally:
+        process.join()
+    return result
+
+def compare(results: list[RenderResult], baseline_path: str, threshold: float) -> list[str]:
+    """Returns a description of every result which is more than threshold (e.g. 0.2 for 20%)
+    slower or larger than the same renderer and format in a previous report."""
+    with open(baseline_path) as f:
+        baseline = {(r["renderer"], r["format"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get((result.renderer, result.format), None)
+        if old is None:
+            continue
+        for field in ("wall_p50_ms", "cpu_mean_ms", "png_kb"):
+            new_value, old_value = getattr(result, field), old[field]
+            if old_value and new_value > old_value * (1 + threshold):
+                regressions.append(f"{result.renderer} {result.format} {field}: {old_value} -> {new_value}")
+    return regressions
+
+def print_results(results: list[RenderResult]):
+    print(f"{'renderer':<12}{'format':<8}{'cold ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'cpu ms':>9}{'per s':>8}"
+          f"{'peak MB':>9}{'+MB':>7}{'PNG KB':>8}")
+    for r in results:
+        print(f"{r.renderer:<12}{r.format:<8}{r.cold_ms:>9}{r.wall_p50_ms:>9}{r.wall_p95_ms:>9}{r.cpu_mean_ms:>9}"
+              f"{r.renders_per_second:>8}{r.peak_rss_mb:>9}{r.rss_growth_mb:>7}{r.png_kb:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MMR table renderers on synthetic tables")
+    parser.add_argument("--iterations", type=int, default=30, help="renders of each format with each renderer")
+    parser.add_argument("--renderer", action="append", choices=list(mmrTables.RENDERERS),
+                        help="only benchmark this renderer (default: all of them)")
+    parser.add_argument("--format", action="append", choices=list(FORMATS),
+                        help="only benchmark this format (default: all of them)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true",
+                        help="don't fork a process for each benchmark (peak RSS then covers everything run before it)")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="a previous report to compare against; exits with 1 if anything regressed")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="how much slower or larger than the baseline counts as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    register_fonts()
+    # load the style and fonts before forking, like the bot does before starting its render processes
+    mmrTables.get_render_context()
+    isolated = not args.in_process and "fork" in multiprocessing.get_all_start_methods()
+    results: list[RenderResult] = []
+    for renderer in args.renderer or list(mmrTables.RENDERERS):
+        for format_name in args.format or list(FORMATS):
+            if isolated:
+                results.append(run_isolated(renderer, format_name, args.iterations, args.seed))
+            else:
+                results.append(run_renderer(renderer, format_name, args.iterations, args.seed))
+    print_results(results)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "matplotlib": matplotlib.__version__,
+        "pillow": PIL.__version__,
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "isolated": isolated,
+        "results": [asdict(r) for r in results],
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
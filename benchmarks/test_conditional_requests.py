@@ -0,0 +1,58 @@
+import asyncio
+from API.get import getPending
+from API.request import request
+from API.session import close_sessions
+from benchmarks.mock_lounge import MockLounge, MockSettings
+from models import WebsiteCredentials
+
+# Checks against the mock website that polling endpoints answered with a 304 return the
+# response cached from the last 200, rather than nothing. Run with `python -m pytest benchmarks`
+# from the repository root.
+
+def _run(test):
+    async def run():
+        lounge = MockLounge(50, 5, MockSettings())
+        url = await lounge.start()
+        try:
+            await test(lounge, WebsiteCredentials(url, "test", "test", "mk8dx"))
+        finally:
+            await close_sessions()
+            await lounge.stop()
+    asyncio.run(run())
+
+def test_not_modified_returns_cached_body():
+    async def test(lounge: MockLounge, credentials: WebsiteCredentials):
+        url = f"{credentials.url}/api/table/unverified?game=mk8dx"
+        first = await request(credentials, "GET", url, conditional=True)
+        assert first.status == 200
+        assert not first.not_modified
+        assert lounge.not_modified["/api/table/unverified"] == 0
+
+        second = await request(credentials, "GET", url, conditional=True)
+        assert lounge.not_modified["/api/table/unverified"] == 1
+        assert second.status == 200
+        assert second.not_modified
+        assert second.body == first.body
+        assert second.json() == first.json()
+    _run(test)
+
+def test_not_modified_pending_tables_match():
+    async def test(lounge: MockLounge, credentials: WebsiteCredentials):
+        first = await getPending(credentials)
+        second = await getPending(credentials)
+        assert lounge.not_modified["/api/table/unverified"] == 1
+        assert first is not None and second is not None
+        assert len(second) == 5
+        assert [t.id for t in second] == [t.id for t in first]
+        assert [t.teams[0].scores[0].player.name for t in second] == [t.teams[0].scores[0].player.name for t in first]
+    _run(test)
+
+def test_changed_body_is_not_cached():
+    async def test(lounge: MockLounge, credentials: WebsiteCredentials):
+        first = await getPending(credentials)
+        lounge.add_table(list(lounge.players.values())[:12], size=2)
+        second = await getPending(credentials)
+        assert lounge.not_modified["/api/table/unverified"] == 0
+        assert first is not None and second is not None
+        assert len(second) == len(first) + 1
+    _run(test)
@@ -4,11 +4,13 @@ from discord import app_commands
 from typing import Optional
 
 import API.post, API.get
-import asyncio
+from API.limiter import bulk
+from API.index import getIndexedPlayersFromDiscord
+from API.stats import get_stats, reset_stats
 
 from util import get_leaderboard, get_leaderboard_slash, fix_player_role
 from models import ServerConfig, LeaderboardConfig, PlayerPlacement, UpdatingBot, ListPlayer
-from custom_checks import leaderboard_autocomplete, app_command_check_admin_roles, command_check_admin_roles
+from custom_checks import leaderboard_autocomplete, app_command_check_admin_roles, command_check_admin_roles, app_command_check_staff_roles, command_check_staff_roles
 from io import StringIO, BytesIO
 import csv
 
@@ -40,18 +42,20 @@ class Admin(commands.Cog):
                 return
             else:
                 await ctx.send("Done")
-        else: 
-            errors = "Errors:\n"
+        else:
+            outbox = self.bot.get_cog('Outbox')
+            if outbox is None:
+                await ctx.send("The outbox isn't running, try again later")
+                return
+            batch = f"place_everyone:{interaction.id}"
+            mutations: list[tuple[str, str, dict]] = []
             for i, row in enumerate(reader):
                 name, mmr = row
-                player, error = await API.post.placePlayer(lb.website_credentials, int(mmr), name)
-                if player is None:
-                    errors += f"{name} - {error}\n"
-                if (i+1) % 100 == 0:
-                    await ctx.send(f"{i+1}/{row_count}")
-                await asyncio.sleep(0.05)
-            error_log = discord.File(BytesIO(errors.encode("utf-8")), filename="error_log.txt")
-            await ctx.send(f"{row_count}/{row_count} - done", file=error_log)
+                # the keys only stop the same command from being queued twice,
+                # using the command again places the players again
+                mutations.append((f"{batch}:{i}:placePlayer:{name}", "placePlayer", {"mmr": int(mmr), "name": name}))
+            queued = await outbox.enqueue(lb, mutations, batch=batch, channel_id=ctx.channel.id)
+            await ctx.send(f"Queued {queued}/{row_count} placements, I'll post here when they're done")
 
     async def get_player_list(self, ctx: commands.Context, lb: LeaderboardConfig):
         await ctx.defer()
@@ -87,14 +91,25 @@ class Admin(commands.Cog):
     async def fix_all_player_roles(self, ctx: commands.Context, lb: LeaderboardConfig):
         if not ctx.guild: 
             return
-        member_count = len(ctx.guild.members)
+        members = ctx.guild.members
+        member_count = len(members)
         await ctx.send("Working...")
-        for i, member in enumerate(ctx.guild.members):
-            player = await API.get.getPlayerFromDiscord(lb.website_credentials, member.id)
-            await fix_player_role(ctx.guild, lb, player, member)
+        with bulk():
+            # download the player list once instead of looking up every member
+            players, errors = await getIndexedPlayersFromDiscord(lb.website_credentials, [m.id for m in members], max_age=0)
+        failed: list[discord.Member] = []
+        for i, (member, player, error) in enumerate(zip(members, players, errors)):
+            # don't take roles away from members we couldn't look up
+            if error is not None and error != "Player not found":
+                failed.append(member)
+            else:
+                await fix_player_role(ctx.guild, lb, player, member)
             if (i+1) % 100 == 0:
                 await ctx.send(f"{i+1}/{member_count}")
         await ctx.send(f"{member_count}/{member_count} - done")
+        if failed:
+            await ctx.send(f"Couldn't look up {len(failed)} members on the website, their roles were not changed. Try again later:\n"
+                           + ", ".join(m.display_name for m in failed[:50]) + ("..." if len(failed) > 50 else ""))
     
     @commands.check(command_check_admin_roles)
     @commands.command(name="fixAllRoles")
@@ -111,6 +126,37 @@ class Admin(commands.Cog):
         lb = get_leaderboard_slash(ctx, leaderboard)
         await self.fix_all_player_roles(ctx, lb)
 
+    async def api_stats(self, ctx: commands.Context, reset: bool):
+        since, stats = get_stats()
+        if reset:
+            reset_stats()
+        if not stats:
+            await ctx.send("No API requests have been made yet")
+            return
+        lines = [f"{'Endpoint':<40}{'Reqs':>7}{'304s':>6}{'Wire KB':>10}{'Body KB':>10}{'Decode ms':>11}{'Objects':>9}"]
+        for endpoint, s in sorted(stats.items(), key=lambda e: e[1].wire_bytes, reverse=True):
+            lines.append(f"{endpoint[:39]:<40}{s.requests:>7}{s.not_modified:>6}{s.wire_bytes/1024:>10.1f}"
+                         f"{s.body_bytes/1024:>10.1f}{s.decode_seconds*1000:>11.1f}{s.objects:>9}")
+        table = "\n".join(lines)
+        msg = f"API usage since <t:{int(since)}:f>{' (now reset)' if reset else ''}"
+        if len(table) > 1900:
+            f = discord.File(BytesIO(table.encode("utf-8")), filename="api_stats.txt")
+            await ctx.send(msg, file=f)
+        else:
+            await ctx.send(f"{msg}\n```{table}```")
+
+    @commands.check(command_check_staff_roles)
+    @commands.command(name="apiStats")
+    async def api_stats_text(self, ctx: commands.Context, reset: bool = False):
+        await self.api_stats(ctx, reset)
+
+    @app_commands.check(app_command_check_staff_roles)
+    @app_commands.command(name="api_stats")
+    @app_commands.guild_only()
+    async def api_stats_slash(self, interaction: discord.Interaction, reset: bool = False):
+        ctx = await commands.Context.from_interaction(interaction)
+        await self.api_stats(ctx, reset)
+
     async def unlockdown(self, channel:discord.TextChannel):
         overwrite = channel.overwrites_for(channel.guild.default_role)
         overwrite.send_messages = None
@@ -1,8 +1,10 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import API.get, API.post
-from models import LeaderboardConfig
+import API.get
+from API.limiter import bulk
+from API.outbox import sendMutations
+from models import LeaderboardConfig, Player, Bonus
 from custom_checks import command_check_staff_roles, app_command_check_staff_roles, app_command_check_admin_roles
 from util import get_leaderboard, get_leaderboard_slash, update_roles
 import custom_checks
@@ -20,10 +22,18 @@ class Bonuses(commands.Cog):
         if player is None:
             await ctx.send("Player not found!")
             return
-        bonus, error = await API.post.createBonus(lb.website_credentials, player.name, amount)
+        arguments = {"name": player.name, "amount": amount}
+        [(bonus, error, retry)] = await sendMutations(lb.website_credentials, "createBonus", [arguments])
         if bonus is None:
+            outbox = self.bot.get_cog('Outbox')
+            if retry and outbox is not None:
+                await outbox.enqueue_unsent(ctx, lb, "createBonus", [arguments])
+                return
             await ctx.send(f"An error occurred while giving the bonus:\n{error}")
             return
+        await self.announce_bonus(ctx, lb, player, bonus, reason)
+
+    async def announce_bonus(self, ctx: commands.Context, lb: LeaderboardConfig, player: Player, bonus: Bonus, reason: str | None):
         rankChange = await update_roles(ctx, lb, player, bonus.prev_mmr, bonus.new_mmr)
 
         embed_title = "Bonus added"
@@ -45,7 +55,7 @@ class Bonuses(commands.Cog):
             if not member:
                 return
             try:
-                await member.send(f"You were given a +{amount} MMR bonus in {ctx.guild.name}. Reason: {reason}")
+                await member.send(f"You were given a +{bonus.amount} MMR bonus in {ctx.guild.name}. Reason: {reason}")
             except Exception as e:
                 pass
 
@@ -81,20 +91,37 @@ class Bonuses(commands.Cog):
         # takes in a CSV file with 2 columns - Name and MMR
         file = await csv_file.read()
         decoded_file = file.decode().splitlines()
-        row_count = len(decoded_file)
         reader = csv.reader(decoded_file)
-        for i, row in enumerate(reader):
-            player_ids = row[:-2]
+        player_ids: list[int] = []
+        amounts: list[int] = []
+        for row in reader:
             # tournament placement is row[-2], not used
-            bonus_amount = int(row[-1])
-            for player_id in player_ids:
-                player = await API.get.getPlayerFromLounge(lb.website_credentials, int(player_id))
+            for player_id in row[:-2]:
+                player_ids.append(int(player_id))
+                amounts.append(int(row[-1]))
+        with bulk():
+            players, _ = await API.get.getPlayersFromLounge(lb.website_credentials, player_ids)
+            found: list[tuple[Player, int]] = []
+            for player_id, player, amount in zip(player_ids, players, amounts):
                 if player is None:
                     await ctx.send(f"Player with ID {player_id} not found")
                     continue
-                await self.give_bonus(ctx, lb, bonus_amount, player.name, reason="Tournament Prize")
+                found.append((player, amount))
+            arguments = [{"name": player.name, "amount": amount} for player, amount in found]
+            results = await sendMutations(lb.website_credentials, "createBonus", arguments)
+        outbox = self.bot.get_cog('Outbox')
+        unsent: list[dict] = []
+        for i, ((player, _), bonus_arguments, (bonus, error, retry)) in enumerate(zip(found, arguments, results)):
+            if bonus is None and retry and outbox is not None:
+                unsent.append(bonus_arguments)
+            elif bonus is None:
+                await ctx.send(f"An error occurred while giving the bonus to {player.name}:\n{error}")
+            else:
+                await self.announce_bonus(ctx, lb, player, bonus, reason="Tournament Prize")
             if (i+1) % 100 == 0:
-                await ctx.send(f"{i+1}/{row_count}")
+                await ctx.send(f"{i+1}/{len(found)}")
+        if unsent:
+            await outbox.enqueue_unsent(ctx, lb, "createBonus", unsent)
         await ctx.send("Done")
 
 
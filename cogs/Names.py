@@ -10,6 +10,7 @@ from discord.utils import format_dt
 import custom_checks
 from models import LeaderboardConfig, PlayerDetailed, UpdatingBot
 import API.get, API.post
+from API.index import isNameTaken
 from datetime import datetime, timedelta, timezone
 from util import (
   get_leaderboard,
@@ -54,6 +55,9 @@ class Names(commands.Cog):
             allowed_change_date = (last_change_date + timedelta(days=60)).strftime('%m/%d/%Y')
             await ctx.send(f"You changed your name less than 60 days ago. You can request a new name on {allowed_change_date}.")
             return
+        if await isNameTaken(lb.website_credentials, name, player.id):
+            await ctx.send("Another player already has this name, please choose a different one.")
+            return
         content = "Please confirm the name change within 30 seconds to make a name change request"
         e = discord.Embed(title="Name Change")
         e.add_field(name="Current Name", value=player.name, inline=False)
@@ -277,6 +281,9 @@ class Names(commands.Cog):
         if player is None:
             await ctx.send("Player with old name can't be found")
             return
+        if await isNameTaken(lb.website_credentials, newName, player.id):
+            await ctx.send("User with that new name already exists")
+            return
         if player.discord_id:
             try:
                 member = await ctx.guild.fetch_member(int(player.discord_id))
@@ -488,6 +495,13 @@ class NameRequestModal(discord.ui.Modal, title="Name Change Request"):
             await interaction.response.send_message(error, ephemeral=True)
             return
 
+        if await isNameTaken(self.lb.website_credentials, name, self.player.id):
+            await interaction.response.send_message(
+                "Another player already has this name, please choose a different one.",
+                ephemeral=True
+            )
+            return
+
         success, request = await API.post.requestNameChange(
             self.lb.website_credentials,
             self.player.name,
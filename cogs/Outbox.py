@@ -0,0 +1,169 @@
+import asyncio
+import traceback
+from io import BytesIO
+import aiohttp
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+from API.limiter import bulk
+from API.outbox import sendMutation, OutboxRetryException, IDEMPOTENT_OPERATIONS
+from database import (enqueue_mutations, get_pending_mutations, set_mutation_status, recover_interrupted_mutations,
+                      get_outbox_counts, get_batch_summary, delete_finished_mutations,
+                      OUTBOX_SENDING, OUTBOX_DONE, OUTBOX_FAILED, OUTBOX_PENDING)
+from models import UpdatingBot, LeaderboardConfig, WebsiteCredentials
+from custom_checks import app_command_check_staff_roles, command_check_staff_roles
+
+# how long sent mutations are kept in the database, so that the same mutation isn't sent twice
+OUTBOX_KEEP_SECONDS = 7 * 24 * 60 * 60
+# the longest we wait before trying a mutation again while the website is having problems
+OUTBOX_MAX_RETRY_DELAY = 300
+
+class Outbox(commands.Cog):
+    """Sends changes to the Lounge website from a queue saved in the database.
+
+    Commands that make many changes at once call `enqueue` and return straight away. A worker
+    for each leaderboard sends the queued changes in order in the bulk lane of the rate limiter,
+    and waits and tries again when the website is unavailable, so nothing is lost if the website
+    goes down or the bot restarts halfway through. When every change from one command has been
+    sent, a summary is posted in the channel the command was used in."""
+    def __init__(self, bot: UpdatingBot):
+        self.bot = bot
+        self.credentials: dict[tuple[str, str | None], WebsiteCredentials] = {}
+        self.wakeups: dict[tuple[str, str | None], asyncio.Event] = {}
+        self.tasks: list[asyncio.Task] = []
+        for server in bot.config.servers.values():
+            for lb in server.leaderboards.values():
+                key = (lb.website_credentials.url, lb.website_credentials.game)
+                self.credentials.setdefault(key, lb.website_credentials)
+
+    async def cog_load(self):
+        failed = await recover_interrupted_mutations(self.bot.db_wrapper, IDEMPOTENT_OPERATIONS)
+        if failed:
+            print(f"{failed} outbox changes were interrupted while sending and have been marked as failed")
+        await delete_finished_mutations(self.bot.db_wrapper, OUTBOX_KEEP_SECONDS)
+        for key, credentials in self.credentials.items():
+            self.wakeups[key] = asyncio.Event()
+            self.tasks.append(asyncio.create_task(self.drain_forever(credentials, self.wakeups[key])))
+
+    async def cog_unload(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+
+    async def enqueue(self, lb: LeaderboardConfig, mutations: list[tuple[str, str, dict]],
+                      batch: str | None = None, channel_id: int | None = None) -> int:
+        """Queues (idempotency key, operation, arguments) mutations to be sent to the website of lb.
+        The operation is the name of an API.post function in API.outbox.OUTBOX_OPERATIONS and the
+        arguments are its keyword arguments. Returns how many mutations were queued; mutations
+        whose key was already queued or sent are skipped. Keys are kept for a week, so they should
+        include the ID of the command they came from, so that only retries of that command are skipped."""
+        credentials = lb.website_credentials
+        queued = await enqueue_mutations(self.bot.db_wrapper, credentials.url, credentials.game,
+                                         mutations, batch, channel_id)
+        wakeup = self.wakeups.get((credentials.url, credentials.game), None)
+        if wakeup is not None:
+            wakeup.set()
+        return queued
+
+    async def enqueue_unsent(self, ctx: commands.Context, lb: LeaderboardConfig, operation: str, arguments: list[dict]) -> int:
+        """Queues mutations which a command couldn't send straight away because the website was
+        unavailable (see API.outbox.sendMutations), and tells the user that they've been queued."""
+        command_id = ctx.interaction.id if ctx.interaction else ctx.message.id
+        batch = f"{operation}:{command_id}"
+        mutations = [(f"{batch}:{i}", operation, mutation_arguments) for i, mutation_arguments in enumerate(arguments)]
+        queued = await self.enqueue(lb, mutations, batch=batch, channel_id=ctx.channel.id)
+        await ctx.send(f"The website is unavailable right now, so {queued} {operation} changes have been queued "
+                       "and will be sent when it's back. I'll post here when they're done")
+        return queued
+
+    async def drain_forever(self, credentials: WebsiteCredentials, wakeup: asyncio.Event):
+        await self.bot.wait_until_ready()
+        retry_delay = 0
+        while True:
+            wakeup.clear()
+            try:
+                retry_delay = await self.drain(credentials, retry_delay)
+            except Exception:
+                traceback.print_exc()
+                retry_delay = OUTBOX_MAX_RETRY_DELAY
+            if retry_delay:
+                await asyncio.sleep(retry_delay)
+                continue
+            try:
+                # the timeout picks up mutations queued while the bot was offline
+                await asyncio.wait_for(wakeup.wait(), timeout=60)
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self, credentials: WebsiteCredentials, retry_delay: float) -> float:
+        """Sends the pending mutations of a leaderboard in order. Returns 0 once they've all been
+        sent, or how long to wait before trying again if the website is unavailable."""
+        db_wrapper = self.bot.db_wrapper
+        while True:
+            mutations = await get_pending_mutations(db_wrapper, credentials.url, credentials.game)
+            if not mutations:
+                return 0
+            batches: set[str] = set()
+            for mutation in mutations:
+                if mutation.batch:
+                    batches.add(mutation.batch)
+                await set_mutation_status(db_wrapper, mutation.id, OUTBOX_SENDING, mutation.attempts + 1)
+                try:
+                    with bulk():
+                        error = await sendMutation(credentials, mutation.operation, mutation.arguments)
+                except (OutboxRetryException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # keep the mutation at the front of the queue so that changes stay in order
+                    await set_mutation_status(db_wrapper, mutation.id, OUTBOX_PENDING, error=str(e))
+                    await self.report_batches(batches)
+                    return min(OUTBOX_MAX_RETRY_DELAY, max(5, retry_delay * 2))
+                retry_delay = 0
+                if error is None:
+                    await set_mutation_status(db_wrapper, mutation.id, OUTBOX_DONE)
+                else:
+                    await set_mutation_status(db_wrapper, mutation.id, OUTBOX_FAILED, error=error)
+            await self.report_batches(batches)
+
+    async def report_batches(self, batches: set[str]):
+        for batch in batches:
+            summary = await get_batch_summary(self.bot.db_wrapper, batch)
+            if summary.pending or summary.channel_id is None:
+                continue
+            channel = self.bot.get_channel(summary.channel_id)
+            if not isinstance(channel, discord.abc.Messageable):
+                continue
+            msg = f"Finished sending {summary.done + len(summary.failed)} changes to the website: {summary.done} succeeded"
+            if not summary.failed:
+                await channel.send(msg)
+                continue
+            errors = "\n".join(f"{operation} {arguments} - {error}" for operation, arguments, error in summary.failed)
+            error_log = discord.File(BytesIO(errors.encode("utf-8")), filename="error_log.txt")
+            await channel.send(f"{msg}, {len(summary.failed)} failed", file=error_log)
+
+    async def outbox_status(self, ctx: commands.Context):
+        counts = await get_outbox_counts(self.bot.db_wrapper)
+        if not counts:
+            await ctx.send("The outbox is empty")
+            return
+        lines = [f"{'Website':<40}{'Pending':>9}{'Sending':>9}{'Done':>9}{'Failed':>9}"]
+        for (url, game), statuses in counts.items():
+            website = f"{url} ({game})" if game else url
+            lines.append(f"{website[:39]:<40}" + "".join(f"{statuses.get(status, 0):>9}"
+                         for status in (OUTBOX_PENDING, OUTBOX_SENDING, OUTBOX_DONE, OUTBOX_FAILED)))
+        table = "\n".join(lines)
+        await ctx.send(f"```{table}```")
+
+    @commands.check(command_check_staff_roles)
+    @commands.command(name="outbox")
+    async def outbox_status_text(self, ctx: commands.Context):
+        await self.outbox_status(ctx)
+
+    @app_commands.check(app_command_check_staff_roles)
+    @app_commands.command(name="outbox")
+    @app_commands.guild_only()
+    async def outbox_status_slash(self, interaction: discord.Interaction):
+        ctx = await commands.Context.from_interaction(interaction)
+        await self.outbox_status(ctx)
+
+async def setup(bot: UpdatingBot):
+    await bot.add_cog(Outbox(bot))
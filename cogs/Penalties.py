@@ -1,8 +1,10 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
 import API.get, API.post
-from models import LeaderboardConfig, Player
+from API.outbox import sendMutations
+from models import LeaderboardConfig, Player, Penalty
 from util import update_roles, get_leaderboard, get_leaderboard_slash
 from custom_checks import app_command_check_updater_roles, command_check_updater_roles
 import custom_checks
@@ -53,13 +55,9 @@ class Penalties(commands.Cog):
             strike_str += f"ID: {strike.id} {date_formatted} ({date_relative})\n"
         return strike_str
 
-    async def pen_channel(self, ctx: commands.Context, lb: LeaderboardConfig, player: Player, tier: str, reason: str | None, table_id: int | None,
-                          amount: int, channel: discord.TextChannel, is_anonymous: bool, is_strike: bool):
+    async def pen_channel(self, ctx: commands.Context, lb: LeaderboardConfig, player: Player, pen: Penalty, tier: str, reason: str | None,
+                          table_id: int | None, amount: int, channel: discord.TextChannel, is_anonymous: bool, is_strike: bool):
         assert ctx.guild is not None
-        pen, error = await API.post.createPenalty(lb.website_credentials, player.name, abs(amount), is_strike)
-        if pen is None:
-            await ctx.send(f"An error occurred while penalizing {player.name}:\n{error}")
-            return None
         embed_title = "Penalty added"
         if is_strike:
             embed_title = "Penalty + strike added"
@@ -125,25 +123,38 @@ class Penalties(commands.Cog):
             return [None]
         pen_channel = ctx.guild.get_channel(lb.penalty_channel) if lb.penalty_channel else None
         channel =  ctx.guild.get_channel(lb.tier_results_channels[tier]) if pen_channel == None else pen_channel
+        # look up everyone at once, by discord ID or name
+        discord_names = [name for name in names if name.isdigit()]
+        other_names = [name for name in names if not name.isdigit()]
+        (by_discord, _), (by_name, _) = await asyncio.gather(
+            API.get.getPlayersFromDiscord(lb.website_credentials, [int(name) for name in discord_names]),
+            API.get.getPlayers(lb.website_credentials, other_names))
+        found = dict(zip(discord_names, by_discord)) | dict(zip(other_names, by_name))
         players: list[Player] = []
         for name in names:
-            if name.isdigit():
-                player = await API.get.getPlayerFromDiscord(lb.website_credentials, int(name))
-                if player is None:
-                    await ctx.send(f"The following player could not be found: {name}")
-                    return [None]
-                players.append(player)
-            else:
-                player = await API.get.getPlayer(lb.website_credentials, name)
-                if player is None:
-                    await ctx.send(f"The following player could not be found: {name}")
-                    return [None]
-                players.append(player)
+            player = found[name]
+            if player is None:
+                await ctx.send(f"The following player could not be found: {name}")
+                return [None]
+            players.append(player)
         id_result = []
         if channel:
             assert isinstance(channel, discord.TextChannel)
-            for player in players:
-                id_result.append(await self.pen_channel(ctx, lb, player, tier, reason, table_id, amount, channel, is_anonymous, is_strike))
+            arguments = [{"name": player.name, "amount": abs(amount), "isStrike": is_strike} for player in players]
+            results = await sendMutations(lb.website_credentials, "createPenalty", arguments)
+            outbox = self.bot.get_cog('Outbox')
+            unsent: list[dict] = []
+            for player, penalty_arguments, (pen, error, retry) in zip(players, arguments, results):
+                if pen is None:
+                    if retry and outbox is not None:
+                        unsent.append(penalty_arguments)
+                    else:
+                        await ctx.send(f"An error occurred while penalizing {player.name}:\n{error}")
+                    id_result.append(None)
+                    continue
+                id_result.append(await self.pen_channel(ctx, lb, player, pen, tier, reason, table_id, amount, channel, is_anonymous, is_strike))
+            if unsent:
+                await outbox.enqueue_unsent(ctx, lb, "createPenalty", unsent)
         return id_result
 
     async def parse_and_add_penalty(self, ctx: commands.Context, lb: LeaderboardConfig, amount:int, tier, args: str, is_anonymous=False, is_strike=False):
@@ -0,0 +1,117 @@
+import asyncio
+import random
+import time
+import traceback
+from dataclasses import replace
+from discord.ext import commands
+
+from API.index import PlayerIndex, refresh_player_index, diff_player_indexes, load_player_index
+from API.limiter import bulk
+from models import UpdatingBot, LeaderboardConfig, WebsiteCredentials
+from util import load_player_list, save_player_list, save_player_list_changes
+
+# if more players than this share of the list (and at least MIN_SUSPICIOUS_REMOVALS) disappear
+# from it at once, the list is more likely incomplete than all of them being deleted, so the
+# listeners aren't told about the removals
+MAX_REMOVED_SHARE = 0.05
+MIN_SUSPICIOUS_REMOVALS = 10
+
+class LeaderboardSync:
+    """Background sync of one website leaderboard. Servers which use the same leaderboard
+    share a sync, and every one of them is told about the changes."""
+    def __init__(self, credentials: WebsiteCredentials):
+        self.credentials = credentials
+        self.subscribers: list[tuple[int, LeaderboardConfig]] = []
+        self.snapshot: PlayerIndex | None = None
+
+    @property
+    def interval(self):
+        """The shortest interval of the servers using this leaderboard, or 0 if they all disabled the sync."""
+        return min((lb.player_sync_interval for _, lb in self.subscribers if lb.player_sync_interval > 0), default=0)
+    
+    @property
+    def jitter(self):
+        return max(lb.player_sync_jitter for _, lb in self.subscribers)
+    
+    def next_delay(self):
+        return max(1, self.interval + random.uniform(-self.jitter, self.jitter))
+
+class PlayerSync(commands.Cog):
+    """Periodically downloads the player list of every leaderboard and dispatches a
+    `player_list_changed` event with the differences from the previous download.
+    Listeners receive the guild ID, the LeaderboardConfig and a PlayerListChanges.
+
+    The player list is also saved to the database, and the saved copy is loaded
+    when the bot starts so that player lookups don't have to wait for a download."""
+    def __init__(self, bot: UpdatingBot):
+        self.bot = bot
+        self.syncs: dict[tuple[str, str | None], LeaderboardSync] = {}
+        self.tasks: list[asyncio.Task] = []
+        for guild_id, server in bot.config.servers.items():
+            for lb in server.leaderboards.values():
+                key = (lb.website_credentials.url, lb.website_credentials.game)
+                if key not in self.syncs:
+                    self.syncs[key] = LeaderboardSync(lb.website_credentials)
+                self.syncs[key].subscribers.append((guild_id, lb))
+
+    async def cog_load(self):
+        for sync in self.syncs.values():
+            self.tasks.append(asyncio.create_task(self.sync_forever(sync)))
+
+    async def cog_unload(self):
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+
+    async def load_saved_list(self, sync: LeaderboardSync):
+        saved = await load_player_list(self.bot.db_wrapper, sync.credentials)
+        if saved is None:
+            return
+        players, saved_at = saved
+        sync.snapshot = await load_player_index(sync.credentials, players, saved_at)
+        print(f"Loaded {len(players)} saved players for {sync.credentials.url} ({sync.credentials.game}), "
+              f"{int(time.time() - saved_at)}s old")
+
+    async def sync_forever(self, sync: LeaderboardSync):
+        # the saved copy is only kept up to date by the sync
+        if sync.interval <= 0:
+            return
+        try:
+            await self.load_saved_list(sync)
+        except Exception:
+            traceback.print_exc()
+        await self.bot.wait_until_ready()
+        # spread out the first downloads when there are several leaderboards
+        await asyncio.sleep(random.uniform(0, sync.jitter))
+        while True:
+            try:
+                await self.sync_once(sync)
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(sync.next_delay())
+
+    async def sync_once(self, sync: LeaderboardSync):
+        with bulk():
+            index = await refresh_player_index(sync.credentials)
+        if index is None:
+            return
+        previous, sync.snapshot = sync.snapshot, index
+        # the first download is only used as the starting point
+        if previous is None:
+            await save_player_list(self.bot.db_wrapper, sync.credentials, [index.player(row) for row in range(len(index))])
+            return
+        changes = await asyncio.to_thread(diff_player_indexes, previous, index)
+        await save_player_list_changes(self.bot.db_wrapper, sync.credentials, changes)
+        if not changes:
+            return
+        print(f"Player list changes for {sync.credentials.url} ({sync.credentials.game}): {changes.summary()}")
+        if len(changes.removed) >= max(MIN_SUSPICIOUS_REMOVALS, len(previous) * MAX_REMOVED_SHARE):
+            print(f"{len(changes.removed)} of {len(previous)} players are missing from the player list of "
+                  f"{sync.credentials.url} ({sync.credentials.game}), not removing their roles. "
+                  "Use fixAllRoles if they were really removed")
+            changes = replace(changes, removed=[])
+        for guild_id, lb in sync.subscribers:
+            self.bot.dispatch("player_list_changed", guild_id, lb, changes)
+
+async def setup(bot: UpdatingBot):
+    await bot.add_cog(PlayerSync(bot))
@@ -3,6 +3,7 @@ from discord import app_commands
 from discord.ext import commands
 from models import LeaderboardConfig, UpdatingBot, PlayerBasic
 import API.get, API.post
+from API.index import get_player_index
 from custom_checks import yes_no_check, command_check_admin_verification_roles, command_check_all_staff_roles, command_check_updater_roles, command_check_staff_roles, check_staff_roles, find_member
 import custom_checks
 from util import get_leaderboard, get_leaderboard_slash, place_player_with_mmr, fix_player_role, add_player, country_code_to_emoji
@@ -297,13 +298,17 @@ class Players(commands.Cog):
     @commands.guild_only()
     async def add_all_discords_text(self, ctx: commands.Context):
         lb = get_leaderboard(ctx)
-        players = await API.get.getPlayerList(lb.website_credentials)
-        if players is None:
+        index = await get_player_index(lb.website_credentials, max_age=0)
+        if index is None:
             await ctx.send("An error occurred getting the player list")
             return
-        for player in players:
-            if player.discord_id is not None:
-                continue
+        outbox = self.bot.get_cog('Outbox')
+        if outbox is None:
+            await ctx.send("The outbox isn't running, try again later")
+            return
+        batch = f"addAllDiscords:{ctx.message.id}"
+        mutations: list[tuple[str, str, dict]] = []
+        for player in index.players_without_discord():
             if player.mmr is None:
                 role_id = lb.placement_role_id
             else:
@@ -312,9 +317,10 @@ class Players(commands.Cog):
             if member is None:
                 print(f"could not find member with name {player.name}")
                 continue
-            success, _ = await API.post.updateDiscord(lb.website_credentials, player.name, member.id)
-            if success is True:
-                print(f"Added discord id for {player.name}: {member.id}")
+            mutations.append((f"{batch}:updateDiscord:{player.id}:{member.id}",
+                              "updateDiscord", {"name": player.name, "discord_id": member.id}))
+        queued = await outbox.enqueue(lb, mutations, batch=batch, channel_id=ctx.channel.id)
+        await ctx.send(f"Queued {queued} discord IDs to be added, I'll post here when they're done")
 
     async def player_data(self, ctx: commands.Context[UpdatingBot], name: str, lb: LeaderboardConfig):
         await ctx.defer()
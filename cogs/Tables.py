@@ -113,15 +113,16 @@ class Tables(commands.Cog):
             return
         
         #checking names with the leaderboard API
-        players = await API.get.getPlayers(lb.website_credentials, names)
+        players, errors = await API.get.getPlayers(lb.website_credentials, names)
         err_str = ""
         found_players: list[Player] = []
         for i, player in enumerate(players):
             if player is None:
                 if check_displayable_name(names[i]):
-                    err_str += f"{names[i]}\n"
+                    err_str += f"{names[i]}"
                 else:
-                    err_str += f"<invalid_name>\n"
+                    err_str += f"<invalid_name>"
+                err_str += f" ({errors[i]})\n" if errors[i] != "Player not found" else "\n"
             else:
                 found_players.append(player)
         if len(err_str) > 0:
@@ -165,15 +166,16 @@ class Tables(commands.Cog):
                     names.append(name)
                     scores.append(score)
             #checking names with the leaderboard API
-            players = await API.get.getPlayers(lb.website_credentials, names)
+            players, errors = await API.get.getPlayers(lb.website_credentials, names)
             err_str = ""
             found_players: list[Player] = []
             for i, player in enumerate(players):
                 if player is None:
                     if check_displayable_name(names[i]):
-                        err_str += f"{names[i]}\n"
+                        err_str += f"{names[i]}"
                     else:
-                        err_str += f"<invalid_name>\n"
+                        err_str += f"<invalid_name>"
+                    err_str += f" ({errors[i]})\n" if errors[i] != "Player not found" else "\n"
                 else:
                     found_players.append(player)
             if len(err_str) > 0:
@@ -4,14 +4,17 @@ from discord.ext import commands
 
 import mmrTables
 import API.post, API.get
+from API.index import getIndexedPlayerFromDiscord
+from API.breaker import WebsiteUnavailableException
+from API.limiter import bulk
 
 from custom_checks import check_updater_roles, command_check_reporter_roles, command_check_updater_roles, app_command_check_updater_roles, command_check_admin_roles
 import custom_checks
 
 from typing import Optional
 from datetime import datetime, timedelta
-from util import submit_table, delete_table, get_leaderboard, get_leaderboard_slash, set_multipliers, update_roles, parse_scores, check_placements
-from models import ServerConfig, LeaderboardConfig, UpdatingBot, Player
+from util import submit_table, delete_table, get_leaderboard, get_leaderboard_slash, set_multipliers, update_roles, parse_scores, check_placements, fix_player_role
+from models import ServerConfig, LeaderboardConfig, UpdatingBot, Player, PlayerListChanges
 
 import traceback
 import copy
@@ -97,6 +100,10 @@ class Updating(commands.Cog):
                 success = await self.update_table(ctx, lb, table.id)
                 if success is False:
                     return
+            except WebsiteUnavailableException as e:
+                # every other table would fail the same way
+                await ctx.send(f"Stopped updating tables: {e}")
+                return
             except Exception as e:
                 traceback.print_exc()
         up_to = f"up to ID {until_id} " if until_id else ""
@@ -396,12 +403,13 @@ class Updating(commands.Cog):
             return
         old_names = [names[i].strip() for i in range(0, len(names), 2)]
         new_names = [names[i].strip() for i in range(1, len(names), 2)]
-        players = await API.get.getPlayers(lb.website_credentials, new_names)
+        players, errors = await API.get.getPlayers(lb.website_credentials, new_names)
         found_players: list[Player] = []
         err_str = ""
         for i, player in enumerate(players):
             if not player:
-                err_str += f"{new_names[i]}\n"
+                err_str += f"{new_names[i]}"
+                err_str += f" ({errors[i]})\n" if errors[i] != "Player not found" else "\n"
             else:
                 found_players.append(player)
         if len(err_str) > 0:
@@ -482,7 +490,7 @@ class Updating(commands.Cog):
         if not server_info:
             return
         for lb in server_info.leaderboards.values():
-            player = await API.get.getPlayerFromDiscord(lb.website_credentials, member.id)
+            player, _ = await getIndexedPlayerFromDiscord(lb.website_credentials, member.id)
             if player is None:
                 continue
             player_role = member.guild.get_role(lb.player_role_id)
@@ -523,6 +531,37 @@ class Updating(commands.Cog):
                     continue
                 if player.name != after.display_name:
                     await member.edit(nick=player.name)
+
+    #fixes roles and nicknames of players whose rank, name or discord changed on the website
+    @commands.Cog.listener(name='on_player_list_changed')
+    async def on_player_list_changed(self, guild_id: int, lb: LeaderboardConfig, changes: PlayerListChanges):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        # take roles away from accounts which are no longer linked to a player first,
+        # in case the account was linked to a different player instead
+        unlinked = [p.discord_id for p in changes.removed if p.discord_id is not None]
+        unlinked += [before.discord_id for before, _ in changes.discord_changed if before.discord_id is not None]
+        if unlinked:
+            # a player can be missing from the list without being deleted, so only
+            # take roles away from accounts the website says aren't linked anymore
+            with bulk():
+                _, errors = await API.get.getPlayersFromDiscord(lb.website_credentials, [int(d) for d in unlinked])
+            for discord_id, error in zip(unlinked, errors):
+                if error == "Player not found":
+                    await fix_player_role(guild, lb, None, discord_id)
+
+        def rank_of(mmr: int | None):
+            return None if mmr is None else lb.get_rank(mmr).role_id
+        to_fix = [p for p in changes.added if p.discord_id is not None]
+        to_fix += [after for before, after in changes.mmr_changed if rank_of(before.mmr) != rank_of(after.mmr)]
+        to_fix += [after for _, after in changes.renamed + changes.discord_changed]
+        fixed: set[int] = set()
+        for player in to_fix:
+            if player.discord_id is None or player.id in fixed:
+                continue
+            fixed.add(player.id)
+            await fix_player_role(guild, lb, player, player.discord_id)
         
 async def setup(bot):
     await bot.add_cog(Updating(bot))
@@ -1,19 +1,40 @@
+import asyncio
+import traceback
 import discord
 from discord import app_commands
 from discord.ext import commands
-from models import UpdatingBot, LeaderboardConfig, VerificationRequest
+from models import UpdatingBot, LeaderboardConfig, VerificationRequest, PlayerAllGames
 import custom_checks
 from typing import Optional
 from util import get_leaderboard_slash, get_verifications, add_player, update_verification_approvals, get_verification_by_id, get_user_latest_verification, fix_player_role
 from views import VerifyView
 import API.get, API.post
+from API.limiter import bulk
+from mkcentral import getMKCPlayerFromID, getMKCPlayersFromIDs
 
 class Verification(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.prefetches: set[asyncio.Task] = set()
 
     verify_group = app_commands.Group(name="verify", description="Manage verification requests", guild_only=True)
 
+    def prefetch_verification_data(self, lb: LeaderboardConfig, verifications: list[VerificationRequest]):
+        """Looks up the MKC profile and Lounge account of every listed request in the background,
+        so that approving them or viewing their info finds the results already cached."""
+        task = asyncio.create_task(self._prefetch_verification_data(lb, verifications))
+        self.prefetches.add(task)
+        task.add_done_callback(self.prefetches.discard)
+
+    async def _prefetch_verification_data(self, lb: LeaderboardConfig, verifications: list[VerificationRequest]):
+        try:
+            with bulk():
+                await asyncio.gather(
+                    getMKCPlayersFromIDs(self.bot.config.mkc_credentials, [v.mkc_id for v in verifications]),
+                    API.get.getPlayersAllGamesFromDiscord(lb.website_credentials, [v.discord_id for v in verifications]))
+        except Exception:
+            traceback.print_exc()
+
     @verify_group.command(name="new_view")
     @app_commands.check(custom_checks.app_command_check_admin_verification_roles)
     async def new_verify_view(self, interaction: discord.Interaction):
@@ -49,6 +70,7 @@ class Verification(commands.Cog):
             msg += curr_line
         if len(msg):
             await ctx.send(msg)
+        self.prefetch_verification_data(lb, verifications)
 
     @verify_group.command(name="pending_tickets")
     @app_commands.choices(
@@ -77,10 +99,13 @@ class Verification(commands.Cog):
             msg += curr_line
         if len(msg):
             await ctx.send(msg)
+        self.prefetch_verification_data(lb, verifications)
 
     async def approve_verifications(self, ctx: commands.Context[UpdatingBot], lb: LeaderboardConfig, verifications: list[VerificationRequest]):
         assert ctx.guild is not None
         successes: list[int] = []
+        # look everyone up at once, so the checks below are answered from the cache
+        await API.get.getPlayersAllGamesFromDiscord(lb.website_credentials, [v.discord_id for v in verifications])
         for verification in verifications:
             # check if player has already been verified for another game in the meantime,
             # then register them / fix their role
@@ -270,7 +295,7 @@ class Verification(commands.Cog):
         e.add_field(name="Reason", value=reason, inline=False)
         await verification_log.send(embed=e)
 
-    async def send_verification_info(self, ctx: commands.Context[UpdatingBot], verification: VerificationRequest):
+    async def send_verification_info(self, ctx: commands.Context[UpdatingBot], lb: LeaderboardConfig, verification: VerificationRequest):
         e = discord.Embed(title="Verification Request")
         e.add_field(name="ID", value=verification.id)
         e.add_field(name="Leaderboard", value=verification.leaderboard)
@@ -278,6 +303,16 @@ class Verification(commands.Cog):
         e.add_field(name="Country", value=verification.country_code)
         e.add_field(name="MKC ID", value=f"[{verification.mkc_id}]({ctx.bot.config.mkc_credentials.url}/registry/players/profile?id={verification.mkc_id})")
         e.add_field(name="Mention", value=f"<@{verification.discord_id}>")
+        if verification.approval_status in ("pending", "ticket"):
+            # usually cached already from listing the pending requests
+            mkc_player, lounge_player = await asyncio.gather(
+                getMKCPlayerFromID(ctx.bot.config.mkc_credentials, verification.mkc_id),
+                API.get.getPlayerAllGamesFromDiscord(lb.website_credentials, verification.discord_id))
+            if mkc_player:
+                e.add_field(name="MKC Name", value=f"{mkc_player.name}{' (banned)' if mkc_player.is_banned else ''}")
+            if lounge_player:
+                registrations = f" ({', '.join(lounge_player.registrations)})" if isinstance(lounge_player, PlayerAllGames) else ""
+                e.add_field(name="Lounge Account", value=f"{lounge_player.name}{registrations}")
         e.add_field(name="Status", value=verification.approval_status, inline=False)
         if verification.reason:
             e.add_field(name="Reason", value=verification.reason)
@@ -294,7 +329,7 @@ class Verification(commands.Cog):
         if not verification:
             await ctx.send("Verification with that ID not found")
             return
-        await self.send_verification_info(ctx, verification)
+        await self.send_verification_info(ctx, lb, verification)
 
     @verify_group.command(name="info_discord")
     @app_commands.autocomplete(leaderboard=custom_checks.leaderboard_autocomplete)
@@ -307,7 +342,7 @@ class Verification(commands.Cog):
         if not verification:
             await ctx.send("Verification with that ID not found")
             return
-        await self.send_verification_info(ctx, verification)
+        await self.send_verification_info(ctx, lb, verification)
 
 async def setup(bot: UpdatingBot):
     await bot.add_cog(Verification(bot))
@@ -1,4 +1,10 @@
 verifications_guild_id_leaderboard = """CREATE INDEX IF NOT EXISTS verifications_guild_id_leaderboard
     ON verification_requests(guild_id, leaderboard)"""
 
-all_indices = [verifications_guild_id_leaderboard]
\ No newline at end of file
+outbox_website_status = """CREATE INDEX IF NOT EXISTS outbox_website_status
+    ON outbox(website_url, game, status, id)"""
+
+outbox_batch = """CREATE INDEX IF NOT EXISTS outbox_batch
+    ON outbox(batch)"""
+
+all_indices = [verifications_guild_id_leaderboard, outbox_website_status, outbox_batch]
\ No newline at end of file
@@ -0,0 +1,124 @@
+import json
+import time
+from dataclasses import dataclass
+from .DBWrapper import DBWrapper
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENDING = "sending"
+OUTBOX_DONE = "done"
+OUTBOX_FAILED = "failed"
+
+@dataclass
+class OutboxMutation:
+    id: int
+    website_url: str
+    game: str | None
+    idempotency_key: str
+    operation: str
+    arguments: dict
+    status: str
+    attempts: int
+    error: str | None
+    batch: str | None
+    channel_id: int | None
+
+@dataclass
+class OutboxBatchSummary:
+    pending: int
+    done: int
+    channel_id: int | None
+    # (operation, arguments, error) of each failed mutation
+    failed: list[tuple[str, dict, str | None]]
+
+_MUTATION_COLUMNS = "id, website_url, game, idempotency_key, operation, arguments, status, attempts, error, batch, channel_id"
+
+def _mutation(row) -> OutboxMutation:
+    id, website_url, game, key, operation, arguments, status, attempts, error, batch, channel_id = row
+    return OutboxMutation(id, website_url, game or None, key, operation, json.loads(arguments),
+                          status, attempts, error, batch, channel_id)
+
+async def enqueue_mutations(db_wrapper: DBWrapper, website_url: str, game: str | None,
+                            mutations: list[tuple[str, str, dict]], batch: str | None = None,
+                            channel_id: int | None = None) -> int:
+    """Adds (idempotency key, operation, arguments) mutations to the end of the outbox.
+    Mutations whose key is already in the outbox are skipped, unless they failed, in which case
+    they're queued again. Returns how many mutations were queued."""
+    now = time.time()
+    rows = [(website_url, game or "", key, operation, json.dumps(arguments), OUTBOX_PENDING, batch, channel_id, now)
+            for key, operation, arguments in mutations]
+    async with db_wrapper.connect() as db:
+        changes_before = db.total_changes
+        await db.executemany(f"""INSERT INTO outbox(website_url, game, idempotency_key, operation, arguments,
+                                status, batch, channel_id, created_at)
+                                VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                ON CONFLICT(idempotency_key) DO UPDATE SET
+                                status = excluded.status, attempts = 0, error = NULL,
+                                batch = excluded.batch, channel_id = excluded.channel_id
+                                WHERE status = '{OUTBOX_FAILED}'""", rows)
+        queued = db.total_changes - changes_before
+        await db.commit()
+    return queued
+
+async def get_pending_mutations(db_wrapper: DBWrapper, website_url: str, game: str | None,
+                                limit: int = 100) -> list[OutboxMutation]:
+    """Returns the oldest mutations of a leaderboard which haven't been sent yet, in order."""
+    async with db_wrapper.connect() as db:
+        async with db.execute(f"""SELECT {_MUTATION_COLUMNS} FROM outbox
+                                WHERE website_url = ? AND game = ? AND status = ?
+                                ORDER BY id LIMIT ?""", (website_url, game or "", OUTBOX_PENDING, limit)) as cursor:
+            rows = await cursor.fetchall()
+    return [_mutation(row) for row in rows]
+
+async def set_mutation_status(db_wrapper: DBWrapper, mutation_id: int, status: str,
+                              attempts: int | None = None, error: str | None = None):
+    async with db_wrapper.connect() as db:
+        await db.execute("""UPDATE outbox SET status = ?, attempts = COALESCE(?, attempts), error = ?
+                            WHERE id = ?""", (status, attempts, error, mutation_id))
+        await db.commit()
+
+async def recover_interrupted_mutations(db_wrapper: DBWrapper, idempotent_operations: set[str]) -> int:
+    """Called on startup for mutations which were being sent when the bot stopped. Idempotent mutations
+    are sent again, the others are marked as failed since we can't know if the website received them.
+    Returns how many mutations were marked as failed."""
+    async with db_wrapper.connect() as db:
+        placeholders = ", ".join("?" * len(idempotent_operations))
+        await db.execute(f"""UPDATE outbox SET status = ?
+                            WHERE status = ? AND operation IN ({placeholders})""",
+                         (OUTBOX_PENDING, OUTBOX_SENDING, *idempotent_operations))
+        changes_before = db.total_changes
+        await db.execute("UPDATE outbox SET status = ?, error = ? WHERE status = ?",
+                         (OUTBOX_FAILED, "Interrupted while sending, check the website before retrying", OUTBOX_SENDING))
+        failed = db.total_changes - changes_before
+        await db.commit()
+    return failed
+
+async def get_outbox_counts(db_wrapper: DBWrapper) -> dict[tuple[str, str | None], dict[str, int]]:
+    """Returns the number of mutations with each status for each leaderboard."""
+    counts: dict[tuple[str, str | None], dict[str, int]] = {}
+    async with db_wrapper.connect() as db:
+        async with db.execute("SELECT website_url, game, status, COUNT(*) FROM outbox GROUP BY website_url, game, status") as cursor:
+            rows = await cursor.fetchall()
+    for url, game, status, count in rows:
+        counts.setdefault((url, game or None), {})[status] = count
+    return counts
+
+async def get_batch_summary(db_wrapper: DBWrapper, batch: str) -> OutboxBatchSummary:
+    summary = OutboxBatchSummary(0, 0, None, [])
+    async with db_wrapper.connect() as db:
+        async with db.execute("SELECT operation, arguments, status, error, channel_id FROM outbox WHERE batch = ? ORDER BY id", (batch,)) as cursor:
+            rows = await cursor.fetchall()
+    for operation, arguments, status, error, channel_id in rows:
+        summary.channel_id = channel_id
+        if status == OUTBOX_DONE:
+            summary.done += 1
+        elif status == OUTBOX_FAILED:
+            summary.failed.append((operation, json.loads(arguments), error))
+        else:
+            summary.pending += 1
+    return summary
+
+async def delete_finished_mutations(db_wrapper: DBWrapper, older_than: float):
+    """Deletes mutations which were sent successfully more than older_than seconds ago."""
+    async with db_wrapper.connect() as db:
+        await db.execute("DELETE FROM outbox WHERE status = ? AND created_at < ?", (OUTBOX_DONE, time.time() - older_than))
+        await db.commit()
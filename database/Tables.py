@@ -10,4 +10,42 @@ verification_requests = """CREATE TABLE IF NOT EXISTS verification_requests(
     country_code TEXT
 )"""
 
-all_tables = [verification_requests]
\ No newline at end of file
+# copy of each leaderboard's player list, so that lookups work right after a restart.
+# game is an empty string for websites which only have one game
+player_list_snapshots = """CREATE TABLE IF NOT EXISTS player_list_snapshots(
+    website_url TEXT NOT NULL,
+    game TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY(website_url, game)
+)"""
+
+player_list_players = """CREATE TABLE IF NOT EXISTS player_list_players(
+    website_url TEXT NOT NULL,
+    game TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    mkc_id INTEGER,
+    mmr INTEGER,
+    discord_id INTEGER,
+    events_played INTEGER NOT NULL,
+    PRIMARY KEY(website_url, game, id)
+)"""
+
+# changes to be sent to the Lounge website by the outbox worker, in order of id.
+# status is pending, sending, done or failed
+outbox = """CREATE TABLE IF NOT EXISTS outbox(
+    id INTEGER PRIMARY KEY,
+    website_url TEXT NOT NULL,
+    game TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    operation TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    batch TEXT,
+    channel_id INTEGER,
+    created_at REAL NOT NULL
+)"""
+
+all_tables = [verification_requests, player_list_snapshots, player_list_players, outbox]
\ No newline at end of file
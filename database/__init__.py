@@ -1 +1,2 @@
-from .DBWrapper import DBWrapper
\ No newline at end of file
+from .DBWrapper import DBWrapper
+from .Outbox import *
\ No newline at end of file
@@ -0,0 +1,51 @@
+import time
+from dataclasses import dataclass
+
+# MKC registry data rarely changes, but players who are told that their Discord isn't linked
+# to an MKC account should be able to link it and try again without waiting long
+MKC_TTL = 300
+MKC_MISSING_TTL = 15
+# expired entries are removed once the cache grows past this many entries
+MKC_PRUNE_SIZE = 5000
+
+@dataclass
+class _MKCEntry:
+    # stored as JSON so that every caller decodes its own copy; None means the lookup found nothing
+    data: bytes | None
+    expires_at: float
+
+class MKCCache:
+    """In-memory TTL cache of MKCentral registry lookups, including lookups that found nothing."""
+    def __init__(self, ttl: float = MKC_TTL, missing_ttl: float = MKC_MISSING_TTL):
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.entries: dict[tuple, _MKCEntry] = {}
+
+    def get(self, key: tuple) -> tuple[bool, bytes | None]:
+        entry = self.entries.get(key, None)
+        if entry is None:
+            return False, None
+        if entry.expires_at < time.monotonic():
+            del self.entries[key]
+            return False, None
+        return True, entry.data
+
+    def _put(self, key: tuple, data: bytes | None, ttl: float):
+        now = time.monotonic()
+        if len(self.entries) >= MKC_PRUNE_SIZE:
+            self.entries = {k: e for k, e in self.entries.items() if e.expires_at >= now}
+        self.entries[key] = _MKCEntry(data, now + ttl)
+
+    def put(self, key: tuple, data: bytes):
+        self._put(key, data, self.ttl)
+
+    def put_missing(self, key: tuple):
+        self._put(key, None, self.missing_ttl)
+
+    def clear(self):
+        self.entries.clear()
+
+_mkc_cache = MKCCache()
+
+def get_mkc_cache() -> MKCCache:
+    return _mkc_cache
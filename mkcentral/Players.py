@@ -1,27 +1,65 @@
-import aiohttp
+from API.request import request
+from API.batch import gather_ordered, DEFAULT_CONCURRENCY
+from mkcentral.Cache import get_mkc_cache
 from models import MKCentralCredentials, MKCPlayerList, MKCPlayer
 import msgspec
 
-headers = {'Content-type': 'application/json'}
+_player_decoder = msgspec.json.Decoder(MKCPlayer)
+_player_list_decoder = msgspec.json.Decoder(MKCPlayerList)
+
+async def _getMKCPlayerPage(credentials: MKCentralCredentials, request_url: str, page: int) -> tuple[MKCPlayerList | None, str | None]:
+    resp = await request(credentials, "GET", f"{request_url}&page={page}")
+    if resp.status != 200:
+        return None, f"{resp.status} - {resp.text()}"
+    return msgspec.convert(resp.json(), MKCPlayerList, strict=False), None
 
 async def searchMKCPlayersByDiscordID(credentials: MKCentralCredentials, discord_id: int) -> MKCPlayerList | None:
+    cache = get_mkc_cache()
+    key = (credentials.url, "discord_id", discord_id)
+    hit, data = cache.get(key)
+    if hit:
+        return _player_list_decoder.decode(data) if data is not None else MKCPlayerList([], 0, 0)
     request_url = f"{credentials.url}/api/registry/players?detailed=true&discord_id={discord_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(request_url,headers=headers) as resp:
-            if resp.status != 200:
+    resp = await request(credentials, "GET", request_url)
+    if resp.status != 200:
+        return None
+    data = resp.json()
+    player_list = msgspec.convert(data, MKCPlayerList, strict=False)
+    if player_list.page_count > 1:
+        # fetch the remaining pages at the same time
+        pages, errors = await gather_ordered(list(range(2, player_list.page_count + 1)),
+                                             lambda page: _getMKCPlayerPage(credentials, request_url, page))
+        for page, error in zip(pages, errors):
+            if page is None:
+                print(f"Failed to get a page of MKC players with discord ID {discord_id}: {error}")
                 return None
-            data = await resp.json()
-            player_list = msgspec.convert(data, MKCPlayerList, strict=False)
-        return player_list
+            player_list.player_list.extend(page.player_list)
+    if player_list.player_count:
+        cache.put(key, msgspec.json.encode(player_list))
+    else:
+        cache.put_missing(key)
+    return player_list
     
 async def getMKCPlayerFromID(credentials: MKCentralCredentials, mkc_id: int) -> MKCPlayer | None:
+    cache = get_mkc_cache()
+    key = (credentials.url, "id", mkc_id)
+    hit, data = cache.get(key)
+    if hit:
+        return _player_decoder.decode(data) if data is not None else None
     request_url = f"{credentials.url}/api/registry/players/{mkc_id}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(request_url,headers=headers) as resp:
-            print(resp.status)
-            print(request_url)
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            player = msgspec.convert(data, MKCPlayer, strict=False)
-        return player
\ No newline at end of file
+    resp = await request(credentials, "GET", request_url)
+    if resp.status == 404:
+        cache.put_missing(key)
+        return None
+    if resp.status != 200:
+        return None
+    data = resp.json()
+    player = msgspec.convert(data, MKCPlayer, strict=False)
+    cache.put(key, msgspec.json.encode(player))
+    return player
+
+async def getMKCPlayersFromIDs(credentials: MKCentralCredentials, mkc_ids: list[int],
+                               concurrency: int = DEFAULT_CONCURRENCY) -> tuple[list[MKCPlayer | None], list[str | None]]:
+    async def fetch(mkc_id: int):
+        return await getMKCPlayerFromID(credentials, mkc_id), None
+    return await gather_ordered(mkc_ids, fetch, concurrency)
@@ -1,144 +1,549 @@
 import matplotlib
 matplotlib.use('Agg')
-from matplotlib.colors import LinearSegmentedColormap
-from matplotlib.font_manager import FontProperties
+from matplotlib.colors import LinearSegmentedColormap, to_hex
+from matplotlib.font_manager import FontProperties, findfont
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.table import Cell
+from PIL import Image, ImageDraw, ImageFont
+import hashlib
 import math
+import msgspec
+import multiprocessing
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from io import BytesIO
-from models import LeaderboardConfig, Table
+from models import LeaderboardConfig, LeaderboardRank, Table
 from matplotlib.figure import Figure
 import asyncio
 
-async def create_mmr_table(lb: LeaderboardConfig, table: Table):
+@dataclass
+class MMRTableRow:
+    placement: int | str
+    name: str
+    score: int
+    prev_mmr: int
+    delta: int
+    new_mmr: int
+    promotion: str
+    rank_color: str
+    is_peak: bool
+
+@dataclass
+class MMRTableDescription:
+    """Everything needed to draw an MMR table, small enough to send to a render process quickly."""
+    size: int
+    tier: str
+    table_id: int
+    races_per_mogi: int
+    teams: list[list[MMRTableRow]]
+
+class RankLookup:
+    """Finds the rank of an MMR with a binary search, instead of checking every rank like LeaderboardConfig.get_rank."""
+    def __init__(self, ranks: list[LeaderboardRank]):
+        self.ranks: list[LeaderboardRank] = []
+        for rank in sorted(ranks, key=lambda r: r.mmr):
+            # get_rank picks the first of several ranks with the same MMR
+            if self.ranks and self.ranks[-1].mmr == rank.mmr:
+                continue
+            self.ranks.append(rank)
+        self.mmrs = [r.mmr for r in self.ranks]
+
+    def get_rank(self, mmr: int) -> LeaderboardRank:
+        i = bisect_right(self.mmrs, mmr)
+        if i == 0:
+            raise ValueError(f"No rank for {mmr} MMR")
+        return self.ranks[i - 1]
+
+# rank lookups by id of the leaderboard, along with the leaderboard itself so that its id isn't reused
+_rank_lookups: dict[int, tuple[LeaderboardConfig, RankLookup]] = {}
+
+def get_rank_lookup(lb: LeaderboardConfig) -> RankLookup:
+    cached = _rank_lookups.get(id(lb), None)
+    if cached is None:
+        cached = (lb, RankLookup(lb.ranks))
+        _rank_lookups[id(lb)] = cached
+    return cached[1]
+
+def describe_mmr_table(lb: LeaderboardConfig, table: Table) -> MMRTableDescription:
+    ranks = get_rank_lookup(lb)
+    teams: list[list[MMRTableRow]] = []
+    for team in table.teams:
+        rows: list[MMRTableRow] = []
+        for j, score in enumerate(team.scores):
+            # want to put the team's placement roughly in the middle row of that placement
+            if j == math.ceil(table.size/2-1):
+                placement_text = team.rank
+            else:
+                placement_text = ""
+            assert score.new_mmr is not None
+            assert score.prev_mmr is not None
+            assert score.delta is not None
+            new_rank = ranks.get_rank(score.new_mmr)
+            old_rank = ranks.get_rank(score.prev_mmr)
+            promotion_text = ""
+            if new_rank != old_rank:
+                updown = "+" if score.delta > 0 else "-"
+                promotion_text = f"{updown} {new_rank.name}"
+            rows.append(MMRTableRow(placement_text, score.player.name, score.score, score.prev_mmr, score.delta,
+                                    score.new_mmr, promotion_text, new_rank.color, score.is_peak))
+        teams.append(rows)
+    return MMRTableDescription(table.size, table.tier, table.id, lb.races_per_mogi, teams)
+
+STYLE_FILE = 'lounge_style.mplstyle'
+
+TITLE_COLOR = "#0a2d61"
+HEADER_COLOR = "#1e2630"
+NAME_COLOR = "#212121"
+DATA_COLOR = "#273c5a"
+PEAK_MMR_COLOR = "#F1C232"
+TITLE_FONT_SIZE = 20
+CELL_FONT_SIZE = 14
+
+@dataclass
+class RenderContext:
+    """The parts of an MMR table which are the same for every table, built once per process."""
+    # basically the same thing as a color scale in excel. used for mmr changes
+    cmap: LinearSegmentedColormap
+    peak_mmr_font: FontProperties
+    col_widths: list[float]
+
+_context: RenderContext | None = None
+_context_lock = threading.Lock()
+
+def get_render_context() -> RenderContext:
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                # the style is applied to the global rcParams once, before any table is drawn,
+                # so that tables drawn at the same time in different threads only ever read it
+                matplotlib.rcParams.update(matplotlib.rc_params_from_file(STYLE_FILE))
+                #dark red, gray, and green
+                cmap = LinearSegmentedColormap.from_list("gainloss", ["#C00000", "#D9D9D9", "#548235"])
+                _context = RenderContext(cmap, FontProperties(weight='bold', style='italic'),
+                                         [.13, .3, .13, .16, .12, .16, .25])
+    return _context
+
+def _row_index(table: MMRTableDescription, team: int, player: int) -> int:
+    """The table row of a player, counting the title and header rows and the dividers between teams."""
+    # get the number of rows above current row which are
+    # dividers between teams
+    divider_offset = team if table.size > 1 else 0
+    return int(2 + team*table.size + player + divider_offset)
+
+def _cell_text(table: MMRTableDescription) -> tuple[list[str], list[list]]:
+    """Returns the text of the title row and of every other row of the table."""
+    if table.size == 1:
+        format_text = "Free for All"
+    elif table.size > 1 and table.size < 6:
+        format_text = f"{table.size}v{table.size} Mogi"
+    else:
+        format_text = "6 vs 6"
+    
+    if table.tier == "SQ":
+        tier_text = "Squad Queue"
+    else:
+        tier_text = f"Tier {table.tier}"
+    
+    col_labels = ["", format_text, "", "", "", tier_text, ""]
+
+    cell_data = []
+    #2nd row of the MMR Table
+    cell_data.append(["Rank", "Player", "Score", "MMR", "+/-", "New MMR", "Promotions"])
+    #adding in rows for each player
+    for i, team in enumerate(table.teams):
+        # empty row for team separators
+        if i > 0 and table.size > 1:
+            cell_data.append([""]*7)
+        for row in team:
+            cell_data.append([row.placement, row.name, row.score, row.prev_mmr, f"{row.delta:+d}", row.new_mmr, row.promotion])
+    cell_data.append(["Races:", table.races_per_mogi, "", "", "", "ID:", table.table_id])
+    return col_labels, cell_data
+
+def _draw_mmr_table(table: MMRTableDescription, blank: bool = False) -> Figure:
+    """Lays out an MMR table with matplotlib. A blank table has all of its cells and colours but no text."""
+    context = get_render_context()
+    fig = Figure()
+    ax = fig.subplots()
+    ax.get_xaxis().set_visible(False)
+    ax.get_yaxis().set_visible(False)
+    ax.axis('off')
+
+    col_labels, cell_data = _cell_text(table)
+    if blank:
+        col_labels = [""]*7
+        cell_data = [[""]*7 for _ in cell_data]
+    num_rows = len(cell_data) + 1
+    
+    top_row_colors = [TITLE_COLOR]*7
+    cell_colors = []
+    cell_colors.append([HEADER_COLOR]*7)
+    for i, team in enumerate(table.teams):
+        if i > 0 and table.size > 1:
+            cell_colors.append(["#000000"]*7)
+        for row in team:
+            cell_colors.append([DATA_COLOR, NAME_COLOR, DATA_COLOR, DATA_COLOR, context.cmap(row.delta/350+0.5), DATA_COLOR, DATA_COLOR])
+    cell_colors.append([HEADER_COLOR]*7)
+
+    mmr_table = ax.table(cellText=cell_data,
+                  colWidths = context.col_widths,
+                  colLabels=col_labels,
+                  colColours=top_row_colors,
+                  cellColours=cell_colors,
+                  loc='center',
+                  cellLoc='center',
+                  edges='closed',
+                  fontsize=CELL_FONT_SIZE)
+    mmr_table.auto_set_font_size(False)
+    mmr_table.scale(1.15, 1.75)
+
+    cells = mmr_table.get_celld()
+
+    # styling the first row
+    for j in range(7):
+        cells[(0, j)].set_fontsize(TITLE_FONT_SIZE)
+        cells[(0, j)].set_height(0.1)
+        cells[(0, j)].set_edgecolor(TITLE_COLOR)
+
+    # Right-align allows tier text to overflow to the left,
+    # for some reason it doesn't let you overflow to the right
+    cells[(0, 5)].set_text_props(ha='right')
+
+    for i, team in enumerate(table.teams):
+        for j, row in enumerate(team):
+            row_index = _row_index(table, i, j)
+
+            if table.size > 1:
+                cells[(row_index, 0)].set_edgecolor(DATA_COLOR)
+
+            cells[(row_index, 4)].set_text_props(color='black')
+
+            if row.is_peak:
+                cells[(row_index, 5)].set_text_props(color=PEAK_MMR_COLOR, fontproperties=context.peak_mmr_font)
+
+            cells[(row_index, 6)].set_text_props(color=row.rank_color)
+            
+    # style the last row of the table
+    row_index = num_rows - 1
+    for j in range(7):
+        cells[(row_index, j)].set_edgecolor(HEADER_COLOR)        
+    return fig
+
+def render_mmr_table(table: MMRTableDescription) -> bytes:
+    """Draws an MMR table and returns it as PNG bytes. Runs in the render processes."""
+    b = BytesIO()
+    fig = _draw_mmr_table(table)
+    fig.savefig(b, format='png', bbox_inches='tight', transparent=True)
+    fig.clear()
+    return b.getvalue()
+
+@dataclass
+class MMRTableTemplate:
+    """A blank MMR table drawn by matplotlib, with the pixel box of every cell in the image."""
+    image: Image.Image
+    # (left, top, right, bottom) of each (row, column)
+    cells: dict[tuple[int, int], tuple[float, float, float, float]]
+    # how much of each side of a cell is covered by its edge
+    edge_width: float
+
+_templates: dict[tuple[int, tuple[int, ...]], MMRTableTemplate] = {}
+_templates_lock = threading.Lock()
+_template_fonts: dict[tuple[bool, float], ImageFont.FreeTypeFont] = {}
+
+def _build_template(table: MMRTableDescription) -> MMRTableTemplate:
+    fig = _draw_mmr_table(table, blank=True)
+    canvas = FigureCanvasAgg(fig)
     b = BytesIO()
-    def plot():
-        fig = Figure()
-        ax = fig.subplots()
-        ax.get_xaxis().set_visible(False)
-        ax.get_yaxis().set_visible(False)
-        ax.axis('off')
-        matplotlib.rcParams.update(matplotlib.rc_params_from_file('lounge_style.mplstyle'))
-
-        #dark red, gray, and green
-        mapcolors = ["#C00000", "#D9D9D9", "#548235"]
-        #basically the same thing as a color scale in excel. used for mmr changes
-        cmap = LinearSegmentedColormap.from_list("gainloss", mapcolors)
-
-        title_color = "#0a2d61"
-        header_color = "#1e2630"
-        name_color = "#212121"
-        data_color = "#273c5a"
-        peak_mmr_color = "#F1C232"
-
-        if table.size == 1:
-            format_text = "Free for All"
-        elif table.size > 1 and table.size < 6:
-            format_text = f"{table.size}v{table.size} Mogi"
-        else:
-            format_text = "6 vs 6"
-        
-        if table.tier == "SQ":
-            tier_text = "Squad Queue"
-        else:
-            tier_text = f"Tier {table.tier}"
-        
-        col_labels = ["", format_text, "", "", "", tier_text, ""]
-
-        num_players = sum([1 for t in table.teams for _ in t.scores])
-        
-        top_row_colors = [title_color]*7
-        if table.size > 1:
-            #num of blank rows + num players + num extra rows
-            num_rows = int(num_players/table.size - 1 + num_players+3)
-        else:
-            num_rows = num_players + 3
-
-        cell_data = []
-        cell_colors = []
-        #2nd row of the MMR Table
-        cell_data.append(["Rank", "Player", "Score", "MMR", "+/-", "New MMR", "Promotions"])
-        cell_colors.append([header_color]*7)
-
-        #adding in rows for each player
-        for i, team in enumerate(table.teams):
-            # empty row for team separators
-            if i > 0 and table.size > 1:
-                cell_data.append([""]*7)
-                cell_colors.append(["#000000"]*7)
-            for j, score in enumerate(team.scores):
-                # want to put the team's placement roughly in the middle row of that placement
-                if j == math.ceil(table.size/2-1):
-                    placement_text = team.rank
-                else:
-                    placement_text = ""
-                assert score.new_mmr is not None
-                assert score.prev_mmr is not None
-                assert score.delta is not None
-                new_rank = lb.get_rank(score.new_mmr)
-                old_rank = lb.get_rank(score.prev_mmr)
-                promotion_text = ""
-                if new_rank != old_rank:
-                    updown = "+" if score.delta > 0 else "-"
-                    promotion_text = f"{updown} {new_rank.name}"
-
-                row_data = [placement_text, score.player.name, score.score, score.prev_mmr, f"{score.delta:+d}", score.new_mmr, promotion_text]
-                row_colors = [data_color, name_color, data_color, data_color, cmap(score.delta/350+0.5), data_color, data_color]
-                cell_data.append(row_data)
-                cell_colors.append(row_colors)
-        
-        cell_data.append(["Races:", lb.races_per_mogi, "", "", "", "ID:", table.id])
-        cell_colors.append([header_color]*7)
-
-        mmr_table = ax.table(cellText=cell_data,
-                      colWidths = [.13, .3, .13, .16, .12, .16, .25],
-                      colLabels=col_labels,
-                      colColours=top_row_colors,
-                      cellColours=cell_colors,
-                      loc='center',
-                      cellLoc='center',
-                      edges='closed',
-                      fontsize=14)
-        mmr_table.auto_set_font_size(False)
-        mmr_table.scale(1.15, 1.75)
-
-        cells = mmr_table.get_celld()
-
-        # styling the first row
-        for j in range(7):
-            cells[(0, j)].set_fontsize(20)
-            cells[(0, j)].set_height(0.1)
-            cells[(0, j)].set_edgecolor(title_color)
-
-        # Right-align allows tier text to overflow to the left,
-        # for some reason it doesn't let you overflow to the right
-        cells[(0, 5)].set_text_props(ha='right')
-
-        for i, team in enumerate(table.teams):
-            for j, score in enumerate(team.scores):
-                # get the number of rows above current row which are
-                # dividers between teams
-                divider_offset = i if table.size > 1 else 0
-                row_index = int(2 + i*table.size + j + divider_offset)
-
-                if table.size > 1:
-                    cells[(row_index, 0)].set_edgecolor(data_color)
-
-                cells[(row_index, 4)].set_text_props(color='black')
-
-                if score.is_peak:
-                    cells[(row_index, 5)].set_text_props(color=peak_mmr_color, fontproperties=FontProperties(weight='bold', style='italic'))
-
-                assert score.new_mmr is not None
-                new_rank = lb.get_rank(score.new_mmr)
-                cells[(row_index, 6)].set_text_props(color=new_rank.color)
-                
-        # style the last row of the table
-        row_index = num_rows - 1
-        for j in range(7):
-            cells[(row_index, j)].set_edgecolor(header_color)        
-        
-        fig.savefig(b, format='png', bbox_inches='tight', transparent=True)
-        b.seek(0)
-        fig.clear()
-
-    await asyncio.to_thread(plot)
-    return b
\ No newline at end of file
+    fig.savefig(b, format='png', bbox_inches='tight', transparent=True)
+    image = Image.open(b)
+    image.load()
+    # savefig crops the image to the table plus some padding, so work out
+    # where each cell ended up from the cropped area
+    canvas.draw()
+    renderer = canvas.get_renderer()
+    pad = matplotlib.rcParams['savefig.pad_inches']
+    crop = fig.get_tightbbox(renderer)
+    left = (crop.x0 - pad) * fig.dpi
+    bottom = (crop.y0 - pad) * fig.dpi
+    cells: dict[tuple[int, int], tuple[float, float, float, float]] = {}
+    for position, cell in fig.axes[0].tables[0].get_celld().items():
+        extent = cell.get_window_extent(renderer)
+        cells[position] = (extent.x0 - left, image.height - (extent.y1 - bottom),
+                           extent.x1 - left, image.height - (extent.y0 - bottom))
+    edge_width = matplotlib.rcParams['patch.linewidth'] * fig.dpi / 72 / 2
+    fig.clear()
+    return MMRTableTemplate(image.convert("RGBA"), cells, edge_width)
+
+def get_mmr_table_template(table: MMRTableDescription) -> MMRTableTemplate:
+    key = (table.size, tuple(len(team) for team in table.teams))
+    template = _templates.get(key, None)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(key, None)
+            if template is None:
+                template = _build_template(table)
+                _templates[key] = template
+    return template
+
+def _template_font(size: float, peak: bool = False) -> ImageFont.FreeTypeFont:
+    font = _template_fonts.get((peak, size), None)
+    if font is None:
+        # use the same font files that matplotlib would
+        properties = get_render_context().peak_mmr_font if peak else FontProperties()
+        font = ImageFont.truetype(findfont(properties), size * Figure().dpi / 72)
+        _template_fonts[(peak, size)] = font
+    return font
+
+def _draw_cell_text(draw: ImageDraw.ImageDraw, template: MMRTableTemplate, position: tuple[int, int], text,
+                    font: ImageFont.FreeTypeFont, color: str, align: str = "center"):
+    text = str(text)
+    if not text:
+        return
+    left, top, right, bottom = template.cells[position]
+    if align == "right":
+        x, anchor = right - (right - left) * Cell.PAD, "rs"
+    else:
+        x, anchor = (left + right) / 2, "ms"
+    # matplotlib centres a line of text using the height of "lp", rather than of the text itself
+    _, ascent, _, descent = font.getbbox("lp", anchor="ls")
+    baseline = (top + bottom) / 2 + (descent - ascent) / 2 - descent
+    draw.text((x, baseline), text, font=font, fill=to_hex(color), anchor=anchor)
+
+def render_template_mmr_table(table: MMRTableDescription) -> bytes:
+    """Draws an MMR table by filling in the text and MMR change colours of a cached blank table.
+    Looks the same as render_mmr_table, but is many times faster."""
+    context = get_render_context()
+    template = get_mmr_table_template(table)
+    image = template.image.copy()
+    draw = ImageDraw.Draw(image)
+    text_color = matplotlib.rcParams['text.color']
+    title_font = _template_font(TITLE_FONT_SIZE)
+    font = _template_font(CELL_FONT_SIZE)
+    col_labels, cell_data = _cell_text(table)
+    for j, text in enumerate(col_labels):
+        _draw_cell_text(draw, template, (0, j), text, title_font, text_color, "right" if j == 5 else "center")
+    special_cells: set[tuple[int, int]] = set()
+    for i, team in enumerate(table.teams):
+        for j, row in enumerate(team):
+            row_index = _row_index(table, i, j)
+            # the colour of the MMR change cell is the only colour which changes between tables
+            left, top, right, bottom = template.cells[(row_index, 4)]
+            inset = template.edge_width
+            fill = tuple(round(c * 255) for c in context.cmap(row.delta/350+0.5))
+            draw.rectangle((round(left + inset), round(top + inset), round(right - inset) - 1, round(bottom - inset) - 1), fill=fill)
+            _draw_cell_text(draw, template, (row_index, 4), f"{row.delta:+d}", font, "black")
+            if row.is_peak:
+                _draw_cell_text(draw, template, (row_index, 5), row.new_mmr, _template_font(CELL_FONT_SIZE, peak=True), PEAK_MMR_COLOR)
+            else:
+                _draw_cell_text(draw, template, (row_index, 5), row.new_mmr, font, text_color)
+            _draw_cell_text(draw, template, (row_index, 6), row.promotion, font, row.rank_color)
+            special_cells.update(((row_index, 4), (row_index, 5), (row_index, 6)))
+    for i, row_text in enumerate(cell_data):
+        for j, text in enumerate(row_text):
+            if (i + 1, j) not in special_cells:
+                _draw_cell_text(draw, template, (i + 1, j), text, font, text_color)
+    b = BytesIO()
+    # a little bigger than matplotlib's PNGs, but much quicker to compress
+    image.save(b, format='png', compress_level=1)
+    return b.getvalue()
+
+RENDERERS = {
+    "matplotlib": render_mmr_table,
+    "template": render_template_mmr_table,
+}
+
+def render_table(table: MMRTableDescription, renderer: str) -> bytes:
+    return RENDERERS.get(renderer, render_mmr_table)(table)
+
+# a small table drawn once before the render processes start, so that matplotlib
+# has already loaded its fonts and style when they fork from the bot's process
+_WARM_UP_TABLE = MMRTableDescription(1, "A", 0, 12, [[MMRTableRow(1, "Warm up", 82, 5000, 50, 5050, "", "#000000", False)]])
+
+_pool: ProcessPoolExecutor | None = None
+
+def _worker_ready() -> bool:
+    return True
+
+def start_render_pool(workers: int):
+    """Starts `workers` processes for drawing MMR tables, so that rendering uses other cores and
+    doesn't hold the bot's GIL. With 0 workers, tables are drawn in a thread of the bot's process.
+
+    The workers are forked from the bot, so this should be called at startup before any threads
+    are started (forking a process with other threads running can deadlock the child)."""
+    global _pool
+    render_mmr_table(_WARM_UP_TABLE)
+    if workers <= 0:
+        return
+    try:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+        # fork the workers now rather than when the first table is drawn
+        for _ in range(workers):
+            pool.submit(_worker_ready).result()
+    except (OSError, ValueError, BrokenProcessPool) as e:
+        print(f"Failed to start the table render processes, drawing tables in the bot's process instead: {e}")
+        return
+    _pool = pool
+
+def stop_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+async def render_png(table: MMRTableDescription, renderer: str = "matplotlib") -> bytes:
+    if _pool is not None:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_pool, render_table, table, renderer)
+        except BrokenProcessPool:
+            # a worker died (e.g. it ran out of memory). forking new workers now isn't safe since
+            # the bot has threads running, so draw tables in the bot's process until it restarts
+            print("A table render process stopped unexpectedly, drawing tables in the bot's process from now on")
+            stop_render_pool()
+    return await asyncio.to_thread(render_table, table, renderer)
+
+class RenderCache:
+    """LRU cache of rendered table images. Images are keyed by the table ID and a hash of everything
+    drawn on them, so an image is reused until something on the table changes.
+
+    Images pushed out of memory are written to `directory` if one is set, and read back from there
+    when they're needed again. The oldest files are deleted when they take up more than disk_bytes.
+    The disk is only a cache, so errors reading or writing it are printed and otherwise ignored."""
+    def __init__(self, memory_bytes: int, directory: str | None = None, disk_bytes: int = 0):
+        self.memory_bytes = memory_bytes
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self.entries: OrderedDict[str, bytes] = OrderedDict()
+        self.size = 0
+        self.disk_size: int | None = None
+        # spills run in threads, and only one of them should write and delete files at a time
+        self.disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(table: MMRTableDescription, renderer: str) -> str:
+        digest = hashlib.sha256(msgspec.msgpack.encode((renderer, table))).hexdigest()
+        return f"{table.table_id}-{digest[:32]}"
+
+    def _path(self, key: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, f"{key}.png")
+
+    async def get(self, key: str) -> bytes | None:
+        png = self.entries.get(key, None)
+        if png is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return png
+        if self.directory is not None:
+            png = await asyncio.to_thread(self._read_file, key)
+            if png is not None:
+                self.disk_hits += 1
+                await self.put(key, png)
+                return png
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, png: bytes):
+        if key in self.entries:
+            return
+        self.entries[key] = png
+        self.size += len(png)
+        evicted: list[tuple[str, bytes]] = []
+        while self.size > self.memory_bytes and self.entries:
+            old_key, old_png = self.entries.popitem(last=False)
+            self.size -= len(old_png)
+            evicted.append((old_key, old_png))
+        if evicted and self.directory is not None:
+            await asyncio.to_thread(self._spill, evicted)
+
+    def _read_file(self, key: str) -> bytes | None:
+        try:
+            with open(self._path(key), 'rb') as f:
+                png = f.read()
+            # mark the file as recently used, since the oldest files are the first to be deleted
+            os.utime(self._path(key))
+            return png
+        except OSError:
+            return None
+
+    def _spill(self, evicted: list[tuple[str, bytes]]):
+        with self.disk_lock:
+            try:
+                self._write_files(evicted)
+            except OSError as e:
+                print(f"Failed to write table images to {self.directory}: {e}")
+                # count the files again next time, since we don't know how far we got
+                self.disk_size = None
+
+    def _write_files(self, evicted: list[tuple[str, bytes]]):
+        assert self.directory is not None
+        os.makedirs(self.directory, exist_ok=True)
+        if self.disk_size is None:
+            self.disk_size = sum(size for _, size, _ in self._list_files())
+        for key, png in evicted:
+            path = self._path(key)
+            if os.path.exists(path):
+                continue
+            with open(path, 'wb') as f:
+                f.write(png)
+            self.disk_size += len(png)
+        if self.disk_size > self.disk_bytes:
+            self._prune_files()
+
+    def _list_files(self) -> list[tuple[float, int, str]]:
+        """Returns the (modified time, size, path) of each file in the directory."""
+        assert self.directory is not None
+        files = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                # deleted since the directory was listed
+                continue
+        return files
+
+    def _prune_files(self):
+        assert self.disk_size is not None
+        # delete down to 90% of the limit, so that we don't have to do this again for every new file
+        for _, size, path in sorted(self._list_files()):
+            if self.disk_size <= self.disk_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_size -= size
+
+_render_cache = RenderCache(32 * 1024 * 1024)
+# renders in progress, so that the same image asked for twice at once is only drawn once
+_rendering: dict[str, asyncio.Task] = {}
+
+def configure_render_cache(memory_bytes: int, directory: str | None = None, disk_bytes: int = 0):
+    global _render_cache
+    _render_cache = RenderCache(memory_bytes, directory, disk_bytes)
+
+def get_render_cache() -> RenderCache:
+    return _render_cache
+
+async def create_mmr_table(lb: LeaderboardConfig, table: Table):
+    description = describe_mmr_table(lb, table)
+    key = RenderCache.key(description, lb.table_renderer)
+    png = await _render_cache.get(key)
+    if png is None:
+        task = _rendering.get(key, None)
+        if task is None:
+            task = asyncio.create_task(render_png(description, lb.table_renderer))
+            _rendering[key] = task
+            task.add_done_callback(lambda _: _rendering.pop(key, None))
+        png = await asyncio.shield(task)
+        await _render_cache.put(key, png)
+    return BytesIO(png)
\ No newline at end of file
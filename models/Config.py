@@ -8,6 +8,12 @@ class WebsiteCredentials:
     password: str
     game: str | None
     has_all_games_endpoint: bool = True
+    # client side rate limit for all requests to this website
+    requests_per_second: float = 10.0
+    request_burst: int = 20
+    # requests fail immediately for breaker_open_seconds after this many failed requests in a row (0 to disable)
+    breaker_failure_threshold: int = 5
+    breaker_open_seconds: float = 30.0
 
 @dataclass
 class MKCentralCredentials:
@@ -63,6 +69,13 @@ class LeaderboardConfig:
     ranks: list[LeaderboardRank]
     tier_results_channels: dict[str, int]
     penalty_channel: int | None
+    # how often (in seconds) the player list is downloaded in the background to look for changes,
+    # plus or minus a random jitter so that leaderboards don't all sync at once. 0 disables it
+    player_sync_interval: int = 900
+    player_sync_jitter: int = 60
+    # how MMR table images are drawn: "matplotlib", or "template" to draw the text over a
+    # cached blank table with Pillow, which looks the same but is much faster
+    table_renderer: str = "matplotlib"
 
     def get_rank(self, mmr:int):
         # get all the ranks where our MMR is higher than the minimum MMR
@@ -106,6 +119,13 @@ class BotConfig:
     db_filename: str
     mkc_credentials: MKCentralCredentials
     servers: dict[int, ServerConfig]
+    # processes used to draw MMR table images, 0 draws them in the bot's process
+    render_workers: int = 2
+    # memory used to keep table images that were already drawn. if a directory is set, images
+    # pushed out of memory are kept there instead, up to render_cache_disk_megabytes
+    render_cache_megabytes: int = 32
+    render_cache_directory: str | None = None
+    render_cache_disk_megabytes: int = 512
     
     def get_prefixes(self):
         prefixes = []
@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 from datetime import datetime
-import dateutil.parser
 import urllib.parse
 from models.Players import PlayerBasic, Player
 
@@ -145,58 +144,3 @@ class Table(TableBasic):
     def get_table_image_url(self):
         return f"/TableImage/{self.id}.png"
 
-    @classmethod
-    def from_api_response(cls, body):
-        id = body["id"]
-        season = body["season"]
-        def parse_date(field_name: str):
-            if field_name in body:
-                return dateutil.parser.isoparse(body[field_name])
-            else:
-                return None
-        created_on = dateutil.parser.isoparse(body["createdOn"])
-        verified_on = parse_date("verifiedOn")
-        deleted_on = parse_date("deletedOn")
-        table_message_id = None
-        if "tableMessageId" in body:
-            table_message_id = int(body["tableMessageId"])
-        update_message_id = None
-        if "updateMessageId" in body:
-            update_message_id = int(body["updateMessageId"])
-        author_id = int(body["authorId"])
-        
-        tier = body["tier"]
-        teams: list[TableTeam] = []
-        num_players = 0
-        for t in body["teams"]:
-            rank = t["rank"]
-            scores: list[TableScore] = []
-            for s in t["scores"]:
-                num_players += 1
-                player = PlayerBasic(s["playerId"], s["playerName"], 
-                                     s.get("playerDiscordId", None), s.get("playerCountryCode", None))
-                prev_mmr = s.get("prevMmr", None)
-                new_mmr = s.get("newMmr", None)
-                delta = s.get("delta", None)
-                if "score" in s:
-                    gp_scores: list[int] = [s["score"]]
-                else:
-                    gp_scores: list[int] = s["scores"]
-                multiplier = s["multiplier"]
-                is_peak = s.get("isNewPeakMmr", False)
-                scores.append(TableScore(gp_scores, sum(gp_scores), multiplier, prev_mmr, new_mmr,
-                                         delta, player, is_peak))
-            scores.sort(key=lambda s: s.score, reverse=True)
-            teams.append(TableTeam(rank, scores))
-        size = int(num_players / body["numTeams"])
-        table = cls(size, tier, teams, author_id, None, id, season, created_on, verified_on,
-                    deleted_on, table_message_id, update_message_id)
-        return table
-    
-    @classmethod
-    def from_list_api_response(cls, body:list):
-        tables: list[Table] = []
-        for t in body:
-            tables.append(Table.from_api_response(t))
-        return tables
-
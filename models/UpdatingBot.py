@@ -6,4 +6,14 @@ class UpdatingBot(commands.Bot):
     def __init__(self, config: BotConfig, db_wrapper: DBWrapper, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.config = config
-        self.db_wrapper = db_wrapper
\ No newline at end of file
+        self.db_wrapper = db_wrapper
+
+    async def setup_hook(self):
+        # imported here since the API package depends on models
+        from API.session import open_sessions
+        await open_sessions(self.config)
+
+    async def close(self):
+        from API.session import close_sessions
+        await super().close()
+        await close_sessions()
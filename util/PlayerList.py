@@ -0,0 +1,53 @@
+import time
+from database import DBWrapper
+from models import WebsiteCredentials, ListPlayer, PlayerListChanges
+
+def _player_row(credentials: WebsiteCredentials, player: ListPlayer):
+    return (credentials.url, credentials.game or "", player.id, player.name, player.mkc_id,
+            player.mmr, player.discord_id, player.events_played)
+
+async def load_player_list(db_wrapper: DBWrapper, credentials: WebsiteCredentials) -> tuple[list[ListPlayer], float] | None:
+    """Returns the saved player list of a leaderboard and the unix time it was saved at."""
+    game = credentials.game or ""
+    async with db_wrapper.connect() as db:
+        async with db.execute("""SELECT saved_at FROM player_list_snapshots
+                                WHERE website_url = ? AND game = ?""", (credentials.url, game)) as cursor:
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            saved_at = float(row[0])
+        async with db.execute("""SELECT id, name, mkc_id, mmr, discord_id, events_played
+                                FROM player_list_players
+                                WHERE website_url = ? AND game = ?""", (credentials.url, game)) as cursor:
+            rows = await cursor.fetchall()
+    players = [ListPlayer(id, name, mkc_id, mmr, discord_id, events_played)
+               for id, name, mkc_id, mmr, discord_id, events_played in rows]
+    return players, saved_at
+
+async def save_player_list(db_wrapper: DBWrapper, credentials: WebsiteCredentials, players: list[ListPlayer]):
+    """Replaces the saved player list of a leaderboard."""
+    game = credentials.game or ""
+    async with db_wrapper.connect() as db:
+        await db.execute("DELETE FROM player_list_players WHERE website_url = ? AND game = ?", (credentials.url, game))
+        await db.executemany("""INSERT INTO player_list_players(
+                                website_url, game, id, name, mkc_id, mmr, discord_id, events_played)
+                                VALUES(?, ?, ?, ?, ?, ?, ?, ?)""",
+                             [_player_row(credentials, p) for p in players])
+        await db.execute("""INSERT OR REPLACE INTO player_list_snapshots(website_url, game, saved_at)
+                            VALUES(?, ?, ?)""", (credentials.url, game, time.time()))
+        await db.commit()
+
+async def save_player_list_changes(db_wrapper: DBWrapper, credentials: WebsiteCredentials, changes: PlayerListChanges):
+    """Updates the saved player list of a leaderboard with only the players that changed."""
+    game = credentials.game or ""
+    changed = changes.added + [after for _, after in changes.updated]
+    async with db_wrapper.connect() as db:
+        await db.executemany("DELETE FROM player_list_players WHERE website_url = ? AND game = ? AND id = ?",
+                             [(credentials.url, game, p.id) for p in changes.removed])
+        await db.executemany("""INSERT OR REPLACE INTO player_list_players(
+                                website_url, game, id, name, mkc_id, mmr, discord_id, events_played)
+                                VALUES(?, ?, ?, ?, ?, ?, ?, ?)""",
+                             [_player_row(credentials, p) for p in changed])
+        await db.execute("""INSERT OR REPLACE INTO player_list_snapshots(website_url, game, saved_at)
+                            VALUES(?, ?, ?)""", (credentials.url, game, time.time()))
+        await db.commit()
@@ -3,6 +3,7 @@ from discord.ext import commands
 from models import LeaderboardConfig, Player, PlayerBasic, UpdatingBot, ListPlayer
 from custom_checks import check_valid_name, yes_no_check
 import API.post
+from API.index import isNameTaken
 
 async def add_player(ctx: commands.Context[UpdatingBot], lb: LeaderboardConfig, mkcID: int, member: discord.Member | int, name: str, mmr: int | None, confirm=True, check_exists=True) -> bool:
     assert ctx.guild is not None
@@ -29,6 +30,9 @@ async def add_player(ctx: commands.Context[UpdatingBot], lb: LeaderboardConfig,
     if not is_valid:
         await ctx.send(str(error))
         return False
+    if await isNameTaken(lb.website_credentials, name):
+        await ctx.send(f"A player named {name} already exists")
+        return False
     
     embedded = None
     if confirm:
@@ -5,4 +5,5 @@ from .Leaderboards import *
 from .Players import *
 from .Updating import *
 from .AutoMod import *
-from .Verification import *
\ No newline at end of file
+from .Verification import *
+from .PlayerList import *
\ No newline at end of file